@@ -15,25 +15,27 @@ Dependencies:
 import argparse
 import json
 
-from newportxps import NewportXPS
 from newportxpslib.controller_interface import move_motors, get_positions, get_status
 from newportxpslib.utils import parse_stages_arg, set_zero_for_stages
+from newportxpslib.xps_connection import get_xps, close_xps
+from newportxpslib.xps_logging import setup_console_logging, set_quiet
 from newportxpslib.xps_config import (
     load_full_config, save_status_report_to_file, backup_xps_config,
-    generate_config, load_user_credentials, CONFIG,
+    generate_config, CONFIG,
     set_active_stages, get_active_stages,
 )
 from newportxpslib.xps_motion import (
     print_motion_format, load_position_combinations,
-    initialize_groups, home_groups, reset_stages,
+    prepare_groups, reset_stages,
     execute_position_configurations, all_groups_ready_and_enabled,
+    CsvLogger,
 )
 
 ###############################
 # --- CLI ARGUMENTS PARSING ---
 ###############################
 
-def parse_args():
+def _build_parser():
     """
     Set up and return the CLI argument parser.
     """
@@ -60,9 +62,24 @@ def parse_args():
                         help="Print the current positions of the selected stages and exit")
     parser.add_argument("--verbose", action="store_true", 
                         help="Enable detailed output for initialization and status")
+    parser.add_argument("--quiet", action="store_true",
+                        help="Only print warnings and errors from the library (no progress messages)")
+    parser.add_argument("--status-report", action="store_true",
+                        help="Save the full XPS status report to xps_status_report.txt (also done with --verbose)")
     parser.add_argument("--set-zero", action="store_true",
         help="Set the current position of all selected stages as their new zero offset in xps_hardware.json")
-    return parser.parse_args()
+    return parser
+
+
+# The parser shape is fixed, so build it once at import.
+_PARSER = _build_parser()
+
+
+def parse_args(argv=None):
+    """
+    Parse CLI arguments (defaults to sys.argv).
+    """
+    return _PARSER.parse_args(argv)
 
 
 def main():
@@ -71,6 +88,9 @@ def main():
     All actual hardware and config logic lives in the imported modules.
     """
     args = parse_args()
+    setup_console_logging()
+    if args.quiet:
+        set_quiet()
 
     try:
         # 1. Print format guide and exit
@@ -78,9 +98,8 @@ def main():
             print_motion_format()
             return
 
-        # 2. Load config and set up user credentials
-        load_user_credentials()
-        config = load_full_config(verbose=True)
+        # 2. Load config and user credentials (once; API calls below skip the reload)
+        load_full_config(verbose=True)
 
         # 3. Handle active stages selection (by CLI, or all)
         stage_list = parse_stages_arg(args.stages)
@@ -93,7 +112,7 @@ def main():
 
         # 5. Option: Print positions of selected stages, then exit
         if args.get_positions:
-            positions = get_positions(stages=stage_list)
+            positions = get_positions(stages=stage_list, load_config=False)
             print("Current positions of selected stages:")
             for stage, pos in positions.items():
                 if pos is not None:
@@ -105,9 +124,7 @@ def main():
         # 6. Connect to XPS controller
         print(f"🔌 Attempting connection to XPS at {CONFIG['XPS_IP']}...")
         try:
-            xps = NewportXPS(CONFIG["XPS_IP"], 
-                        username=CONFIG["USERNAME"], 
-                        password=CONFIG["PASSWORD"])
+            xps = get_xps(verbose=False)
             print("✅ Connected to XPS successfully!\n")
         except Exception as e:
             print(f"❌ Connection failed: {e}")
@@ -122,29 +139,27 @@ def main():
             generate_config(xps)
             return
 
-        # 8. Save status for inspection
-        save_status_report_to_file(xps)
+        # 8. Save status for inspection (a full status query; only on request)
+        if args.status_report or args.verbose:
+            save_status_report_to_file(xps)
 
         # 9. Forced homing/setup if requested (and exit if only homing)
         if args.home:
-            initialize_groups(xps, verbose=args.verbose)
-            home_groups(xps, force_home=True, verbose=args.verbose)
+            prepare_groups(xps, force_home=True, enable=False, verbose=args.verbose)
             print("🏁 Homing completed. Exiting as requested by --home.")
             return
         
         # 10. If reset, reset positions (after setup)
         if args.reset:
-            initialize_groups(xps, verbose=args.verbose)
-            home_groups(xps, force_home=False, verbose=args.verbose)
+            prepare_groups(xps, enable=False, verbose=args.verbose)
             reset_stages(xps, verbose=args.verbose)
-
         # 11. Fast path: skip repeated group prep if everything ready
-        if not args.reset and all_groups_ready_and_enabled(xps):
+        #     (a reset has just prepared the groups, so no need to ask again)
+        elif all_groups_ready_and_enabled(xps):
             if args.verbose:
                 print("🚀 All groups referenced and enabled. Skipping init/home/enable steps.")
         else:
-            initialize_groups(xps, verbose=args.verbose)
-            home_groups(xps, force_home=False, verbose=args.verbose)
+            prepare_groups(xps, enable=False, verbose=args.verbose)
 
         # 12. Load positions from file 
         active_stages = get_active_stages()
@@ -154,22 +169,25 @@ def main():
             print("❌ No valid combinations found in motion file.")
             return
 
-        # 13. Execute moves (loop or single pass)
-        if args.loop:
-            print("🔁 Looping through motion configurations (Ctrl+C to stop)...\n")
-            try:
-                while True:
-                    execute_position_configurations(xps, combos, args.log)
-            except KeyboardInterrupt:
-                print("\n⛔ Loop interrupted by user.")
-        else:
-            execute_position_configurations(xps, combos, args.log)
+        # 13. Execute moves (loop or single pass); --verbose forces per-row output
+        verbose = True if args.verbose else None
+        log = CsvLogger(args.log) if args.log else None
+        try:
+            if args.loop:
+                print("🔁 Looping through motion configurations (Ctrl+C to stop)...\n")
+                try:
+                    while True:
+                        execute_position_configurations(xps, combos, log, verbose=verbose)
+                except KeyboardInterrupt:
+                    print("\n⛔ Loop interrupted by user.")
+            else:
+                execute_position_configurations(xps, combos, log, verbose=verbose)
+        finally:
+            if log:
+                log.close()
 
         print("\n🔄 Closing connection...")
-        try:
-            xps.ftpconn.close()
-        except Exception:
-            pass
+        close_xps()
         print("✅ Connection closed.")
 
     except Exception as e:
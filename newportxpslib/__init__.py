@@ -1,3 +1,5 @@
 from .controller_interface import move_motors, get_positions, get_status
-from .xps_config import load_full_config, load_user_credentials
+from .xps_config import load_full_config, load_user_credentials, clear_config_cache
+from .xps_connection import get_xps, close_xps
+from .xps_logging import setup_console_logging, set_quiet
 from .xps_motion import home_groups, reset_stages, enable_groups, initialize_groups
\ No newline at end of file
@@ -6,154 +6,101 @@ Reusable API-like functions for controlling Newport XPS stages:
 - get_positions
 - get_status
 
-All functions are stateless: connect, do the work, disconnect.
+All functions share one persistent XPS connection (see xps_connection),
+so repeated calls do not pay the TCP/FTP login cost again. The connection
+stays open between calls; call close_xps() when done.
+
+Messages go through the package logger (see xps_logging); set_quiet() or the
+CLI's --quiet flag drops the routine ones.
 """
-from newportxpslib.xps_config import (
-    load_full_config, load_user_credentials, CONFIG, get_active_stages
-)
+import logging
+
+from newportxpslib.xps_config import load_full_config
 from newportxpslib.xps_motion import (
-    initialize_groups, home_groups, enable_groups,
-    wait_until_reached_blocking, move_stage_with_offset,
-    all_groups_ready_and_enabled, get_stage_position_with_offset,
+    prepare_groups, wait_until_reached_blocking, dispatch_moves,
+    all_groups_ready_and_enabled, get_stage_positions_with_offset,
 )
-from newportxps import NewportXPS
+from newportxpslib.xps_connection import get_xps
+from newportxpslib.utils import resolve_stages
+
+logger = logging.getLogger(__name__)
 
-def move_motors(*positions, stages=None, skip_prep=False, verbose=False):
+def move_motors(*positions, stages=None, skip_prep=False, verbose=False, load_config=True):
     """
     Moves Newport XPS motors to the given absolute positions.
 
     Arguments:
         positions: list of float values, one per stage.
-        stages: list of stage names, e.g. ["SP1.Pos1", "SP3.Pos3"]. 
+        stages: list of stage names and/or 1-based numbers, e.g. ["SP1.Pos1", 3].
                 If None, uses all active stages.
         skip_prep: if True, skips group enable/init/homing steps 
                             (faster, but assumes system is ready).
         verbose: if True, prints extra info.
+        load_config: if False, use the configuration already loaded into
+                     CONFIG (e.g. by the CLI) instead of checking the files again.
     """
 
-    # Load config and connect to XPS
-    load_user_credentials()
-    config = load_full_config()
-    
-    # Parse the stages argument (name or 1-based index)
-    if stages is not None:
-        chosen_stages = []
-        for s in stages:
-            if isinstance(s, int):
-                if s <= 0 or s > len(CONFIG["STAGES"]):
-                    raise ValueError(f"Stage index {s} out of range.")
-                chosen_stages.append(CONFIG["STAGES"][s - 1]) # 1-based to 0-based!
-            elif isinstance(s, str):
-                if s not in CONFIG["STAGES"]:
-                    raise ValueError(f"Stage name '{s}' not found.")
-                chosen_stages.append(s)
-            else:
-                raise ValueError(f"Stage specifier must be int or str, got: {s}")
-    else:
-        chosen_stages = get_active_stages()
+    if load_config:
+        load_full_config()
 
-    if len(positions) != len(stages):
-        raise ValueError(f"Expected {len(stages)} positions, got {len(positions)}.")
+    # Validate everything before touching the network
+    chosen_stages = resolve_stages(stages)
+    if len(positions) != len(chosen_stages):
+        raise ValueError(f"Expected {len(chosen_stages)} positions, got {len(positions)}.")
 
-    print(f"🔌 Connecting to XPS at {CONFIG['XPS_IP']}...")
-    xps = NewportXPS(CONFIG["XPS_IP"], 
-                    username=CONFIG["USERNAME"], 
-                    password=CONFIG["PASSWORD"])
-    print("✅ Connected.")
+    xps = get_xps(verbose=verbose)
 
     if not skip_prep:
         if all_groups_ready_and_enabled(xps):
             if verbose:
-                print("🚀 All groups referenced and enabled. Skipping init/home/enable steps.")
+                logger.info("🚀 All groups referenced and enabled. Skipping init/home/enable steps.")
         else:
-            initialize_groups(xps, verbose=verbose)
-            home_groups(xps, force_home=False, verbose=verbose)
-            enable_groups(xps, verbose=verbose)
+            prepare_groups(xps, verbose=verbose)
     else:
         if verbose:
-            print("⚡ Skipping ALL motion preparation! (skip_prep=True)")
-
-    move_targets = ", ".join(f"{stage} → {pos}" for stage, pos in zip(chosen_stages, positions))
-    print(f"➡ Moving: {move_targets}")
-
-    move_failed = False
-    for stage, pos in zip(chosen_stages, positions):
-        try:
-            move_stage_with_offset(xps, stage, pos)
-        except Exception as e:
-            print(f"❌ Error moving {stage}: {e}")
-            move_failed = True
-
-    if move_failed:
-        print("❌ One or more move commands failed. Skipping wait for completion.")
-        try: xps.ftpconn.close()
-        except Exception: pass
+            logger.info("⚡ Skipping ALL motion preparation! (skip_prep=True)")
+
+    if verbose and logger.isEnabledFor(logging.INFO):
+        move_targets = ", ".join(f"{stage} → {pos}" for stage, pos in zip(chosen_stages, positions))
+        logger.info("➡ Moving: %s", move_targets)
+
+    move_errors = dispatch_moves(xps, chosen_stages, positions)
+    for stage, e in move_errors:
+        logger.error("❌ Error moving %s: %s", stage, e)
+
+    if move_errors:
+        logger.error("❌ One or more move commands failed. Skipping wait for completion.")
         return False
 
     reached = wait_until_reached_blocking(xps, positions, stages=chosen_stages)
-    if reached:
-        print("✅ Reached all target positions.")
-    else:
-        print("❌ ERROR: Could not confirm all stages reached their targets.")
+    if not reached:
+        logger.error("❌ ERROR: Could not confirm all stages reached their targets.")
+    elif verbose:
+        logger.info("✅ Reached all target positions.")
 
-    try:
-        xps.ftpconn.close()
-    except Exception:
-        pass
     return reached
 
 
-def get_positions(stages=None):
+def get_positions(stages=None, load_config=True, use_cache=False):
     """
     Returns a dictionary of current stage positions.
     Args:
         stages: Optional list of stage names (str) or numbers (int, 1-based).
-                If None, uses all configured stages.
+                If None, uses all active stages.
+        load_config: If False, use the configuration already loaded into
+                     CONFIG instead of checking the files again.
+        use_cache: If True, reuse positions read in the last few tens of
+                   milliseconds instead of querying the controller again.
     Returns:
         dict: { "stage_name": position }
     """
 
-    load_user_credentials()
-    config = load_full_config()
-
-    # Determine which stages to use
-    if stages is not None:
-        chosen_stages = []
-        for s in stages:
-            if isinstance(s, int):
-                # 1-based
-                if s <= 0 or s > len(CONFIG["STAGES"]):
-                    raise ValueError(f"Stage number {s} out of range.")
-                chosen_stages.append(CONFIG["STAGES"][s - 1])
-            elif isinstance(s, str):
-                # Name-based
-                if s not in CONFIG["STAGES"]:
-                    raise ValueError(f"Stage name '{s}' not found.")
-                chosen_stages.append(s)
-            else:
-                raise ValueError(f"Stage specifier must be int or str, got: {s}")
-    else:
-        chosen_stages = CONFIG["STAGES"]
-
-    xps = NewportXPS(CONFIG["XPS_IP"], 
-                    username=CONFIG["USERNAME"], 
-                    password=CONFIG["PASSWORD"])
-    positions = {}
+    if load_config:
+        load_full_config()
 
-    for stage in chosen_stages:
-        try:
-            pos = get_stage_position_with_offset(xps, stage)
-            positions[stage] = pos
-        except Exception as e:
-            print(f"❌ Failed to get position of {stage}: {e}")
-            positions[stage] = None
-
-    try:
-        xps.ftpconn.close()
-    except Exception:
-        pass
-
-    return positions
+    chosen_stages = resolve_stages(stages)
+    xps = get_xps(verbose=False)
+    return get_stage_positions_with_offset(xps, chosen_stages, use_cache=use_cache)
 
 
 def get_status():
@@ -161,15 +108,5 @@ def get_status():
     Returns the full status report string from the XPS system.
     """
 
-    load_user_credentials()
-    xps = NewportXPS(CONFIG["XPS_IP"], 
-                    username=CONFIG["USERNAME"], 
-                    password=CONFIG["PASSWORD"])
-    report = xps.status_report()
-
-    try:
-        xps.ftpconn.close()
-    except Exception:
-        pass
-
-    return report
\ No newline at end of file
+    xps = get_xps(verbose=False)
+    return xps.status_report()
\ No newline at end of file
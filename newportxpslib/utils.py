@@ -4,44 +4,85 @@ utils.py
 Utility functions for Newport XPS CLI/API.
 
 - Stage parsing from CLI args (names or 1-based indices)
+- Stage resolution for API calls (lists of names and/or 1-based numbers)
 - Setting zero offsets after user calibration
 
 No direct device control logic here!
 """
 
+import os
 import json
-from newportxpslib.xps_config import CONFIG, load_full_config
-from newportxps import NewportXPS
+import logging
+from newportxpslib.xps_config import (
+    CONFIG, load_full_config, clear_config_cache, load_json, get_active_stages,
+    HARDWARE_CONFIG_FILE,
+)
+from newportxpslib.xps_connection import get_xps
+from newportxpslib.xps_motion import get_group_positions
+
+logger = logging.getLogger(__name__)
 
 def parse_stages_arg(stages_arg):
     """
     Parse a --stages argument into a list of stage names.
-    Supports names or 1-based indices (for CLI or scripting).
+    Supports names or 1-based indices, also mixed (for CLI or scripting).
 
     Args:
-        stages_arg: Comma-separated string (e.g. "1,3" or "SP1.Pos1,SP3.Pos3")
+        stages_arg: Comma-separated string (e.g. "1,3", "SP1.Pos1,SP3.Pos3" or "1,SP3.Pos3")
     Returns:
         List of stage names (as in CONFIG["STAGES"])
     """
     if not stages_arg:
         return CONFIG["STAGES"]
+    all_stages = CONFIG["STAGES"]
+    stage_index = CONFIG["_STAGE_INDEX"]
+    n = len(all_stages)
     stage_list = []
-    if all(s.strip().isdigit() for s in stages_arg.split(',')):
-        # By index (1-based)
-        indices = [int(s.strip())-1 for s in stages_arg.split(',')]
-        for i in indices:
-            if i < 0 or i >= len(CONFIG["STAGES"]):
-                raise ValueError(f"Stage index {i+1} out of range.")
-            stage_list.append(CONFIG["STAGES"][i])
-    else:
-        # By name
-        for s in stages_arg.split(','):
-            s = s.strip()
-            if s not in CONFIG["STAGES"]:
-                raise ValueError(f"Stage name '{s}' not found.")
-            stage_list.append(s)
+    # One pass: each token is a 1-based index or a stage name
+    for t in stages_arg.split(','):
+        t = t.strip()
+        if t.isdigit():
+            i = int(t)
+            if i < 1 or i > n:
+                raise ValueError(f"Stage index {i} out of range.")
+            stage_list.append(all_stages[i - 1])
+        elif t in stage_index:
+            stage_list.append(t)
+        else:
+            raise ValueError(f"Stage name '{t}' not found.")
     return stage_list
 
+def resolve_stages(stages_arg):
+    """
+    Resolve API stage specifiers into a list of stage names.
+
+    Args:
+        stages_arg: List of stage names (str) and/or 1-based stage numbers (int),
+                    or None for the active stages.
+    Returns:
+        List of stage names (as in CONFIG["STAGES"])
+    Raises:
+        ValueError: unknown name, number out of range, or unsupported type.
+    """
+    if stages_arg is None:
+        return get_active_stages()
+    stage_index = CONFIG["_STAGE_INDEX"]
+    all_stages = CONFIG["STAGES"]
+    n = len(all_stages)
+    resolved = []
+    for s in stages_arg:
+        if type(s) is int:
+            if s <= 0 or s > n:
+                raise ValueError(f"Stage number {s} out of range.")
+            resolved.append(all_stages[s - 1])  # 1-based to 0-based
+        elif type(s) is str:
+            if s not in stage_index:
+                raise ValueError(f"Stage name '{s}' not found.")
+            resolved.append(s)
+        else:
+            raise ValueError(f"Stage specifier must be int or str, got: {s}")
+    return resolved
+
 def set_zero_for_stages(selected_stages=None):
     """
     Set the current position of all (or selected) stages as their new zero offset in xps_hardware.json.
@@ -58,25 +99,27 @@ def set_zero_for_stages(selected_stages=None):
     load_full_config(verbose=True)
     stages = selected_stages or CONFIG["STAGES"]
 
-    print(f"🔌 Connecting to XPS at {CONFIG['XPS_IP']} to set zero offset(s)...")
-    xps = NewportXPS(CONFIG["XPS_IP"], username=CONFIG["USERNAME"], password=CONFIG["PASSWORD"])
+    xps = get_xps()
+
+    # One position query per group instead of one per stage
+    hw_positions = {}
+    for group in dict.fromkeys(stage.split(".", 1)[0] for stage in stages):
+        hw_positions.update(get_group_positions(xps, group))
 
     zero_offsets = {}
     for stage in stages:
-        pos = xps.get_stage_position(stage)
-        print(f"  {stage}: Current position {pos:.6f} set as new zero.")
+        pos = hw_positions[stage]
+        logger.info("  %s: Current position %.6f set as new zero.", stage, pos)
         zero_offsets[stage] = pos
 
-    hwfile = "config/xps_hardware.json"
-    with open(hwfile, "r") as f:
-        hw = json.load(f)
+    hwfile = HARDWARE_CONFIG_FILE
+    hw = load_json(hwfile)
     hw["zero_offsets"] = hw.get("zero_offsets", {})
     hw["zero_offsets"].update(zero_offsets)
-    with open(hwfile, "w") as f:
-        json.dump(hw, f, indent=4)
-    print(f"✅ Zero offsets updated in {hwfile}.")
-
-    try:
-        xps.ftpconn.close()
-    except Exception:
-        pass
+    # Write to a temp file and swap it in, so a crash never leaves a truncated config
+    tmpfile = f"{hwfile}.tmp"
+    with open(tmpfile, "w") as f:
+        json.dump(hw, f, indent=4)  # kept readable: this file is edited by hand
+    os.replace(tmpfile, hwfile)
+    clear_config_cache()
+    logger.info("✅ Zero offsets updated in %s.", hwfile)
@@ -1,8 +1,16 @@
 import os
 import sys
 import json
+import logging
 from pathlib import Path
 
+try:
+    import orjson  # optional C-accelerated JSON parser
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
 CONFIG = {
     "XPS_IP": "",
     "USERNAME": "",
@@ -10,19 +18,34 @@ CONFIG = {
     "GROUPS": [],
     "STAGES": [],
     "LABELS": [],
+    "_STAGE_INDEX": {},       # stage name -> position in STAGES
     "ZERO_OFFSETS":{},
     "POSITION_TOL": 0.1,
     "WAIT_DELAY": 0.5,
     "MAX_WAIT_TIME": 10,
     "RESET_POSITION": 0.0,
+    "PARALLEL_DISPATCH": True,  # send per-stage move commands concurrently
 }
 
+def load_json(path):
+    """Parse a JSON file, using orjson when it is installed."""
+    if orjson is not None:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
+    with open(path, "r") as f:
+        return json.load(f)
+
 # New: Store the currently active stages for this instance
 ACTIVE_STAGES = None
 
 def set_active_stages(stages):
     """Set which stages will be operated in this instance."""
     global ACTIVE_STAGES
+    if stages is ACTIVE_STAGES or (
+        stages is not None and ACTIVE_STAGES is not None
+        and tuple(stages) == tuple(ACTIVE_STAGES)
+    ):
+        return
     ACTIVE_STAGES = stages
 
 def get_active_stages():
@@ -33,91 +56,127 @@ def get_active_stages():
     return ACTIVE_STAGES
 
 
+# Config file locations, resolved once at import
+CONFIG_DIR = Path(__file__).parent.parent / "config"  # <-- points to newportxps_control/config
+USER_CONFIG_FILE = CONFIG_DIR / "xps_connection_parameters.json"
+HARDWARE_CONFIG_FILE = CONFIG_DIR / "xps_hardware.json"
+
+# (path, mtime) of the last successfully parsed file; a match skips the reparse
+_CRED_CACHE = {"path": None, "mtime": None}
+_HW_CACHE = {"path": None, "mtime": None}
+
+def _mtime(path):
+    """Modification time of `path` in ns, or None if it cannot be stat'ed."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+def _is_cached(cache, path, mtime):
+    return mtime is not None and cache["path"] == path and cache["mtime"] == mtime
+
 def load_user_credentials(user_file=None):
     # Default to config/xps_connection_parameters.json with cross-platform support
-    THIS_DIR = Path(__file__).parent.parent  # <-- points to newportxps_control/
     if user_file is None:
-        user_file = THIS_DIR / "config" / "xps_connection_parameters.json"
+        user_file = USER_CONFIG_FILE
+    mtime = _mtime(user_file)
+    if _is_cached(_CRED_CACHE, user_file, mtime):
+        return
 
-    if not os.path.exists(user_file):
-        print(f"🚫 Missing connection file: '{user_file}' not found.")
-        print("👉 Create the file manually with your XPS login info.")
-        print("📌 Example:\n", json.dumps({
+    try:
+        user = load_json(user_file)
+        CONFIG["XPS_IP"] = user.get("ip", "").strip()
+        CONFIG["USERNAME"] = user.get("username", "").strip()
+        CONFIG["PASSWORD"] = user.get("password", "").strip()
+
+        if not CONFIG["XPS_IP"] or not CONFIG["USERNAME"] or not CONFIG["PASSWORD"]:
+            logger.error("\u274c XPS connection parameters are incomplete.")
+            logger.error("👉 Please fill in all fields in xps_connection_parameters.json")
+            sys.exit(1)
+
+    except FileNotFoundError:
+        logger.error("🚫 Missing connection file: '%s' not found.", user_file)
+        logger.error("👉 Create the file manually with your XPS login info.")
+        logger.error("📌 Example:\n %s", json.dumps({
             "ip": "10.0.0.1",
             "username": "username",
             "password": "password"
         }, indent=4))
         sys.exit(1)
-
-    try:
-        with open(user_file, "r") as f:
-            user = json.load(f)
-            CONFIG["XPS_IP"] = user.get("ip", "").strip()
-            CONFIG["USERNAME"] = user.get("username", "").strip()
-            CONFIG["PASSWORD"] = user.get("password", "").strip()
-
-            if not CONFIG["XPS_IP"] or not CONFIG["USERNAME"] or not CONFIG["PASSWORD"]:
-                print("\u274c XPS connection parameters are incomplete.")
-                print("👉 Please fill in all fields in xps_connection_parameters.json")
-                sys.exit(1)
-
     except Exception as e:
-        print(f"❌ Failed to load user credentials from '{user_file}': {e}")
+        logger.error("❌ Failed to load user credentials from '%s': %s", user_file, e)
         sys.exit(1)
+    _CRED_CACHE.update(path=user_file, mtime=mtime)
 
 def load_full_config(verbose=False):
     """
     Loads user credentials and hardware configuration including
     zero offsets for stages, motion parameters, and groups.
+
+    Each file is reparsed only when its modification time changes, so repeated
+    API calls cost one stat per file.
     """
     load_user_credentials()
-    THIS_DIR = Path(__file__).parent.parent  # <-- points to newportxps_control/
-    hardware_file = THIS_DIR / "config" / "xps_hardware.json"
-    if not os.path.exists(hardware_file):
-        print(f"🚫 Missing hardware file: '{hardware_file}' not found.")
-        print("👉 Generate it using --generate-config.")
-        sys.exit(1)
+    hardware_file = HARDWARE_CONFIG_FILE
+    mtime = _mtime(hardware_file)
+    if not _is_cached(_HW_CACHE, hardware_file, mtime):
+        _load_hardware_config(hardware_file)
+        _HW_CACHE.update(path=hardware_file, mtime=mtime)
+    if verbose:
+        logger.info("✅ Configuration loaded from xps_connection_parameters.json and xps_hardware.json\n")
+    return CONFIG
 
+def _load_hardware_config(hardware_file):
     try:
-        with open(hardware_file, "r") as f:
-            hw = json.load(f)
-            CONFIG["GROUPS"] = hw.get("groups", [])
-            CONFIG["STAGES"] = hw.get("stages", [])
-            CONFIG["LABELS"] = hw.get("labels", CONFIG["STAGES"])
-
-            # Load zero offsets per stage; default to 0.0 if missing for any stage
-            zero_offsets_raw = hw.get("zero_offsets", {})
-            CONFIG["ZERO_OFFSETS"] = {
-                stage: float(zero_offsets_raw.get(stage, 0.0))
-                for stage in CONFIG["STAGES"]
-            }
-            print(f"ℹ️ Zero offsets loaded: {CONFIG['ZERO_OFFSETS']}")
-
-            motion = hw.get("motion", {})
-            CONFIG["POSITION_TOL"] = motion.get("position_tolerance", 0.1)
-            CONFIG["WAIT_DELAY"] = motion.get("wait_delay", 0.5)
-            CONFIG["MAX_WAIT_TIME"] = motion.get("max_wait_time", 10)
-            CONFIG["RESET_POSITION"] = motion.get("reset_position", 0.0)
-        if verbose:
-            print("✅ Configuration loaded from xps_connection_parameters.json and xps_hardware.json\n")
+        hw = load_json(hardware_file)
+        CONFIG["GROUPS"] = hw.get("groups", [])
+        CONFIG["STAGES"] = hw.get("stages", [])
+        CONFIG["LABELS"] = hw.get("labels", CONFIG["STAGES"])
+
+        # Stage name -> index lookup, built once per load
+        CONFIG["_STAGE_INDEX"] = {s: i for i, s in enumerate(CONFIG["STAGES"])}
+
+        # Load zero offsets per stage; default to 0.0 if missing for any stage
+        zero_offsets_raw = hw.get("zero_offsets", {})
+        CONFIG["ZERO_OFFSETS"] = {
+            stage: float(zero_offsets_raw.get(stage, 0.0))
+            for stage in CONFIG["STAGES"]
+        }
+        logger.info("ℹ️ Zero offsets loaded: %s", CONFIG['ZERO_OFFSETS'])
+
+        motion = hw.get("motion", {})
+        CONFIG["POSITION_TOL"] = motion.get("position_tolerance", 0.1)
+        CONFIG["WAIT_DELAY"] = motion.get("wait_delay", 0.5)
+        CONFIG["MAX_WAIT_TIME"] = motion.get("max_wait_time", 10)
+        CONFIG["RESET_POSITION"] = motion.get("reset_position", 0.0)
+        CONFIG["PARALLEL_DISPATCH"] = motion.get("parallel_dispatch", True)
+    except FileNotFoundError:
+        logger.error("🚫 Missing hardware file: '%s' not found.", hardware_file)
+        logger.error("👉 Generate it using --generate-config.")
+        sys.exit(1)
     except Exception as e:
-        print(f"❌ Failed to load config: {e}")
+        logger.error("❌ Failed to load config: %s", e)
         sys.exit(1)
 
     return CONFIG
 
+def clear_config_cache():
+    """Force the next load to reparse both files (e.g. after writing one)."""
+    for cache in (_CRED_CACHE, _HW_CACHE):
+        cache.update(path=None, mtime=None)
+
 def backup_xps_config(xps):
     output_folder = Path("xps_config_backup")
     output_folder.mkdir(exist_ok=True)
     try:
         xps.save_systemini(output_folder / "system.ini")
         xps.save_stagesini(output_folder / "stages.ini")
-        print(f"✅ Config files backed up to '{output_folder}/'\n")
+        logger.info("✅ Config files backed up to '%s/'\n", output_folder)
     except Exception as e:
-        print(f"❌ Failed to backup config: {e}")
+        logger.error("❌ Failed to backup config: %s", e)
 
 def generate_config(xps, output_file=Path("config") / "xps_hardware.json"):
-    print("🛠 Generating config from live XPS system...")
+    logger.info("🛠 Generating config from live XPS system...")
     config = {
         "groups": list(xps.groups.keys()),
         "stages": [],
@@ -127,7 +186,8 @@ def generate_config(xps, output_file=Path("config") / "xps_hardware.json"):
             "position_tolerance": CONFIG["POSITION_TOL"],
             "wait_delay": CONFIG["WAIT_DELAY"],
             "max_wait_time": CONFIG["MAX_WAIT_TIME"],
-            "reset_position": CONFIG["RESET_POSITION"]
+            "reset_position": CONFIG["RESET_POSITION"],
+            "parallel_dispatch": CONFIG["PARALLEL_DISPATCH"]
         }
     }
 
@@ -141,14 +201,15 @@ def generate_config(xps, output_file=Path("config") / "xps_hardware.json"):
 
     with open(output_file, "w") as f:
         json.dump(config, f, indent=4)
+    clear_config_cache()
 
-    print(f"✅ Config generated and saved to '{output_file}'")
+    logger.info("✅ Config generated and saved to '%s'", output_file)
 
 def save_status_report_to_file(xps, filename="xps_status_report.txt"):
     try:
         report = xps.status_report()
         with open(filename, "w") as f:
             f.write(report)
-        print(f"📄 XPS status report saved to '{filename}'\n")
+        logger.info("📄 XPS status report saved to '%s'\n", filename)
     except Exception as e:
-        print(f"❌ Failed to save status report: {e}")
+        logger.error("❌ Failed to save status report: %s", e)
@@ -0,0 +1,125 @@
+"""
+xps_connection.py
+
+Shared, persistent connection to the Newport XPS controller.
+
+Opening a NewportXPS client performs a TCP login and an FTP round trip
+(system.ini is read on connect), so the procedural API and the CLI reuse
+one lazily created client per process instead of reconnecting per call.
+
+- get_xps: return the shared client, connecting on first use
+- close_xps: close the shared client (also registered with atexit)
+- tune_xps_socket: set TCP_NODELAY on a client's command socket
+- close_ftp: close a client's FTP session only if one is still open
+
+The shared client stays open between calls; call close_xps() at shutdown
+(it also runs at interpreter exit).
+"""
+import atexit
+import contextlib
+import logging
+import socket
+import threading
+
+from newportxpslib.xps_config import load_user_credentials, CONFIG
+
+logger = logging.getLogger(__name__)
+
+_xps_singleton = None
+_xps_lock = threading.Lock()
+
+
+def get_xps(verbose=True):
+    """
+    Return the shared NewportXPS client, connecting on first use.
+
+    Arguments:
+        verbose: if True, prints a message when a new connection is opened.
+    """
+    global _xps_singleton
+    if _xps_singleton is None:
+        with _xps_lock:
+            if _xps_singleton is None:
+                # Imported here: newportxps pulls in paramiko/ftplib, which
+                # info-only CLI commands never need.
+                from newportxps import NewportXPS
+                load_user_credentials()
+                if verbose:
+                    logger.info("🔌 Connecting to XPS at %s...", CONFIG['XPS_IP'])
+                xps = NewportXPS(CONFIG["XPS_IP"],
+                                 username=CONFIG["USERNAME"],
+                                 password=CONFIG["PASSWORD"])
+                tune_xps_socket(xps)
+                _xps_singleton = xps
+                if verbose:
+                    logger.info("✅ Connected.")
+    return _xps_singleton
+
+
+def tune_xps_socket(xps, sid=None):
+    """
+    Disable Nagle's algorithm on an XPS command socket.
+
+    Every XPS command is a short request answered before the next one is sent,
+    so delaying small packets for coalescing only adds latency per command.
+
+    Arguments:
+        xps: connected NewportXPS client.
+        sid: driver socket id; defaults to the client's own command socket.
+    """
+    # The driver keeps its sockets in a class-private dict keyed by socket id.
+    sockets = getattr(type(xps._xps), "_XPS__sockets", {})
+    sock = sockets.get(xps._sid if sid is None else sid)
+    if sock is None:
+        return
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    except OSError:
+        pass
+
+
+def close_ftp(xps):
+    """
+    Close the client's FTP/SFTP session, if one is still open.
+
+    newportxps opens and closes its FTP session around each transfer, so after
+    motion-only work there is nothing to tear down and the close is skipped.
+    """
+    ftp = getattr(xps, "ftpconn", None)
+    if ftp is None or getattr(ftp, "_conn", None) is None:
+        return
+    with contextlib.suppress(Exception):
+        ftp.close()
+
+
+def _safe_close(xps):
+    """
+    Close everything a client holds open: pooled sockets, the FTP session
+    and the command socket. Errors are ignored; the client is unusable after.
+    """
+    from newportxpslib.xps_pool import close_pool  # xps_pool imports this module
+    with contextlib.suppress(Exception):
+        close_pool(xps)
+    close_ftp(xps)
+    sid = getattr(xps, "_sid", None)
+    if sid is not None:
+        with contextlib.suppress(Exception):
+            xps._xps.TCP_CloseSocket(sid)
+        xps._sid = None  # keeps newportxps' own atexit disconnect from closing it again
+
+
+def close_xps():
+    """
+    Close the shared XPS client. The next get_xps() call reconnects.
+
+    Registered with atexit; call it explicitly to release the controller
+    connection earlier (e.g. at the end of a long-running script).
+    """
+    global _xps_singleton
+    with _xps_lock:
+        xps, _xps_singleton = _xps_singleton, None
+    if xps is not None:
+        _safe_close(xps)
+
+
+atexit.register(close_xps)
@@ -0,0 +1,43 @@
+"""
+xps_logging.py
+
+Logger shared by the newportxpslib modules; all library messages go through it.
+
+Importing the library adds no handlers: the "newportxpslib" logger propagates,
+so applications route its messages through their own logging setup.
+setup_console_logging() (used by the CLI) prints them as plain text instead,
+so they look like print() output: progress to stdout, warnings and errors to
+stderr. set_quiet() raises the level to WARNING: routine progress messages
+are then dropped before any formatting work is done, while errors still show.
+
+- setup_console_logging: print library messages to the console
+- set_quiet: switch routine messages off (or back on)
+"""
+import logging
+import sys
+
+logger = logging.getLogger("newportxpslib")
+
+_console_handlers = []
+
+
+def setup_console_logging(level=logging.INFO):
+    """Print library messages as plain text: below WARNING to stdout, the rest to stderr."""
+    if _console_handlers:
+        logger.setLevel(level)
+        return
+    plain = logging.Formatter("%(message)s")
+    stdout = logging.StreamHandler(sys.stdout)
+    stdout.addFilter(lambda record: record.levelno < logging.WARNING)
+    stderr = logging.StreamHandler(sys.stderr)
+    stderr.setLevel(logging.WARNING)
+    for handler in (stdout, stderr):
+        handler.setFormatter(plain)
+        logger.addHandler(handler)
+        _console_handlers.append(handler)
+    logger.setLevel(level)
+
+
+def set_quiet(quiet=True):
+    """Show only warnings and errors (quiet=True), or all messages (quiet=False)."""
+    logger.setLevel(logging.WARNING if quiet else logging.INFO)
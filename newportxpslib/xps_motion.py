@@ -1,7 +1,162 @@
+import os
+import json
 import time
 import csv
+import functools
+import logging
+import queue
+import threading
+from concurrent.futures import as_completed
 from datetime import datetime
+from pathlib import Path
 from .xps_config import CONFIG, get_active_stages
+from .xps_pool import get_pool
+
+try:
+    from tqdm import tqdm  # optional progress bar for long, quiet sweeps
+except ImportError:
+    tqdm = None
+
+logger = logging.getLogger(__name__)
+
+# Groups this process has already initialized, homed or enabled. Repeated
+# preparation passes (e.g. --reset followed by the ready check) become no-ops
+# instead of re-querying the controller. Cleared by kill_all_groups() and
+# whenever all_groups_ready_and_enabled() finds a group that is not ready, so a
+# group that dropped out (error, controller reboot) is prepared again.
+_prep_state = {"initialized": set(), "homed": set(), "enabled": set()}
+
+def _groups_done(step):
+    return set(CONFIG["GROUPS"]) <= _prep_state[step]
+
+# Time and host of the last all_groups_ready_and_enabled() call that returned
+# True. Within READY_CACHE_TTL seconds the answer is reused (e.g. a scan loop
+# calling move_motors back to back); a False answer is never cached, and any
+# failed move or read drops the entry.
+READY_CACHE_TTL = 5.0
+_ready_cache = None
+
+def invalidate_ready_cache():
+    """Forget the cached readiness status (call after anything that changes group state)."""
+    global _ready_cache
+    _ready_cache = None
+
+def _cache_ready_status(fcn):
+    @functools.wraps(fcn)
+    def wrapper(xps, status=None):
+        global _ready_cache
+        now = time.monotonic()
+        host = getattr(xps, "host", None)
+        # An explicit status report is fresher than the cache: always evaluate it
+        if status is None and _ready_cache is not None:
+            ts, cached_host = _ready_cache
+            if now - ts < READY_CACHE_TTL and cached_host == host:
+                return True
+        result = fcn(xps, status=status)
+        if result:
+            _ready_cache = (now, host)
+        else:
+            forget_ready_state()  # the next preparation pass must run every step
+        return result
+    return wrapper
+
+# Recently read stage positions (relative to zero offsets). Readers opt in with
+# use_cache=True; poll loops use the shorter POLL_CACHE_TTL. A stage's entry is
+# dropped whenever a move is sent to it.
+POSITION_CACHE_TTL = 0.05
+POLL_CACHE_TTL = 0.02
+
+class _PositionCache:
+    """Last read position per stage as (timestamp, value), valid for `ttl` seconds (0 disables)."""
+
+    def __init__(self, ttl=POSITION_CACHE_TTL):
+        self.ttl = ttl
+        self._entries = {}
+
+    def get(self, stage, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        entry = self._entries.get(stage)
+        if ttl <= 0 or entry is None or time.monotonic() - entry[0] >= ttl:
+            return None
+        return entry[1]
+
+    def put(self, stage, value):
+        if value is not None:
+            self._entries[stage] = (time.monotonic(), value)
+
+    def invalidate(self, stages=None):
+        if stages is None:
+            self._entries.clear()
+            return
+        for stage in stages:
+            self._entries.pop(stage, None)
+
+_position_cache = _PositionCache()
+
+def invalidate_position_cache(stages=None):
+    """Forget cached positions for `stages` (default: all stages)."""
+    _position_cache.invalidate(stages)
+
+# On-disk record that every group was left initialized, homed and enabled,
+# so a new session on the same controller can skip its first readiness query.
+# Written when preparation completes. Removed (with the in-process state, see
+# forget_ready_state) by kill_all_groups(), by any failed move, position read
+# or wait, and when a live readiness check finds a group that is not ready.
+READY_STATE_FILE = Path.home() / ".xps_state.json"
+READY_STATE_MAX_AGE = 3600  # seconds
+
+def save_ready_state():
+    """Record that all configured groups are ready (best effort)."""
+    state = {"ip": CONFIG["XPS_IP"], "groups": CONFIG["GROUPS"],
+             "ts": time.time(), "groups_ready": True}
+    # Written to a temp file and swapped in, so a reader never sees a partial record
+    tmpfile = f"{READY_STATE_FILE}.tmp"
+    try:
+        with open(tmpfile, "w") as f:
+            json.dump(state, f)
+        os.replace(tmpfile, READY_STATE_FILE)
+    except OSError:
+        pass
+
+def load_ready_state():
+    """True if a recent ready record exists for this controller and group list."""
+    try:
+        with open(READY_STATE_FILE, "r") as f:
+            state = json.load(f)
+        age = time.time() - state["ts"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return False
+    return (state.get("groups_ready") is True
+            and state.get("ip") == CONFIG["XPS_IP"]
+            and state.get("groups") == CONFIG["GROUPS"]
+            and 0 <= age < READY_STATE_MAX_AGE)
+
+def clear_ready_state():
+    """Forget the on-disk ready record."""
+    try:
+        os.remove(READY_STATE_FILE)
+    except OSError:
+        pass
+
+def forget_ready_state():
+    """Forget every record of prepared groups: this process's, the cached check and the on-disk one."""
+    for state in _prep_state.values():
+        state.clear()
+    invalidate_ready_cache()
+    clear_ready_state()
+
+def assume_groups_ready(xps):
+    """
+    Seed the readiness check with a True answer, without querying the controller.
+    Only all_groups_ready_and_enabled() uses it (for READY_CACHE_TTL); explicit
+    initialize/home/enable/prepare calls still check the status and act on it.
+    """
+    global _ready_cache
+    _ready_cache = (time.monotonic(), getattr(xps, "host", None))
+
+def _save_ready_state_if_prepared():
+    if all(_groups_done(step) for step in _prep_state):
+        save_ready_state()
 
 def print_motion_format(stage_labels=None):
     if not stage_labels:
@@ -15,232 +170,521 @@ def print_motion_format(stage_labels=None):
     print("10.0, 30.0, 60.0, 90.0, 120.0\n")
 
 def load_position_combinations(filepath, stages):
+    """
+    Read motion.txt: one comma-separated line of positions per configuration.
+    Returns a list of position lists; malformed lines are skipped with a warning.
+    """
     combos = []
-    print(f"📄 Loading position combinations from '{filepath}' expecting {len(stages)} values per line...")
+    n = len(stages)
+    logger.info("📄 Loading position combinations from '%s' expecting %s values per line...", filepath, n)
     try:
         with open(filepath, "r") as f:
-            for lineno, line in enumerate(f, start=1):
-                parts = line.strip().split(",")
-                if len(parts) != len(stages):
-                    print(f"⚠️ Line {lineno} skipped (expected {len(stages)} values): {line.strip()}")
-                    continue
-                try:
-                    positions = [float(p) for p in parts]
-                    combos.append(positions)
-                except ValueError:
-                    print(f"⚠️ Line {lineno} has invalid number(s): {line.strip()}")
+            lines = f.read().splitlines()
     except Exception as e:
-        print(f"❌ Error loading positions: {e}")
+        logger.error("❌ Error loading positions: %s", e)
+        return combos
+
+    # Fast path: a well-formed file is parsed in one comprehension. The comma
+    # count rejects wrong-length lines without splitting them; float() itself
+    # ignores surrounding whitespace, so lines are not stripped.
+    if all(line.count(",") + 1 == n for line in lines):
+        try:
+            return [list(map(float, line.split(","))) for line in lines]
+        except ValueError:
+            pass
+
+    # Slow path: line by line, reporting each bad line
+    combos = []
+    for lineno, line in enumerate(lines, start=1):
+        if line.count(",") + 1 != n:
+            logger.warning("⚠️ Line %s skipped (expected %s values): %s", lineno, n, line.strip())
+            continue
+        try:
+            combos.append(list(map(float, line.split(","))))
+        except ValueError:
+            logger.warning("⚠️ Line %s has invalid number(s): %s", lineno, line.strip())
     return combos
 
-def home_groups(xps, force_home=True, verbose=False):
+def parse_status_report(xps):
+    """
+    Fetch the controller status report once and index it by group.
+    Returns {group: status line}, e.g. {"SP1": "SP1 (ID 0): Ready from homing, Referenced, Enabled"}.
+    """
+    return _status_by_group(xps.status_report().splitlines())
+
+def _status_by_group(status_lines):
+    """One pass over status report lines: {group: first line starting with "<group> ("}."""
+    result = {}
+    for line in status_lines:
+        key, sep, _ = line.partition(" (")
+        if sep and key not in result:
+            result[key] = line
+    return result
+
+def home_groups(xps, force_home=True, verbose=False, status=None):
+    if not force_home and _groups_done("homed"):
+        if verbose:
+            logger.info("ℹ️ All groups already homed in this session.")
+        return
+    if force_home:
+        invalidate_ready_cache()
     if verbose:
-        print("🏠 Checking homing status...")
-    status = xps.status_report()
+        logger.info("🏠 Checking homing status...")
+    if status is None:
+        status = parse_status_report(xps)
     for group in CONFIG["GROUPS"]:
-        line = next((l for l in status.splitlines() if l.startswith(f"{group} (")), None)
-        if line and "Not referenced" in line:
+        if "Not referenced" in status.get(group, ""):
             if force_home:
                 if verbose:
-                    print(f"➡ {group} is not referenced. Homing...")
+                    logger.info("➡ %s is not referenced. Homing...", group)
                 try:
                     xps.home_group(group)
+                    _prep_state["homed"].add(group)
                     if verbose:
-                        print(f"✅ {group} homed.")
+                        logger.info("✅ %s homed.", group)
                 except Exception as e:
-                    print(f"❌ Failed to home {group}: {e}")
+                    logger.error("❌ Failed to home %s: %s", group, e)
             else:
                 if verbose:
-                    print(f"⚠️ {group} not referenced. Auto-homing as required...")
+                    logger.info("⚠️ %s not referenced. Auto-homing as required...", group)
                 try:
                     xps.home_group(group)
+                    _prep_state["homed"].add(group)
                     if verbose:
-                        print(f"✅ {group} auto-homed.")
+                        logger.info("✅ %s auto-homed.", group)
                 except Exception as e:
-                    print(f"❌ Failed to auto-home {group}: {e}")
+                    logger.error("❌ Failed to auto-home %s: %s", group, e)
         else:
+            _prep_state["homed"].add(group)
             if verbose:
-                print(f"✅ {group} is already referenced.")
+                logger.info("✅ %s is already referenced.", group)
 
-def all_groups_ready_and_enabled(xps):
+@_cache_ready_status
+def all_groups_ready_and_enabled(xps, status=None):
     """
     Returns True if all groups are referenced and enabled, False otherwise.
+    status: optional result of parse_status_report(xps), to skip the query.
     """
-    status_lines = xps.status_report().splitlines()
-    all_ready = True
+    if status is None:
+        status = parse_status_report(xps)
     for group in CONFIG["GROUPS"]:
-        for line in status_lines:
-            if line.startswith(f"{group} ("):
-                if not ("Referenced" in line and "Enabled" in line):
-                    all_ready = False
-                break
-    return all_ready
+        line = status.get(group)
+        if line is not None and not ("Referenced" in line and "Enabled" in line):
+            return False
+    return True
 
-def initialize_groups(xps, verbose=False):
+def initialize_groups(xps, verbose=False, status=None):
+    if _groups_done("initialized"):
+        if verbose:
+            logger.info("ℹ️ All groups already initialized in this session.")
+        return
+    invalidate_ready_cache()
     if verbose:
-        print("⚙️ Initializing groups...")
+        logger.info("⚙️ Initializing groups...")
 
-    # Get current status report for all groups
-    status_lines = xps.status_report().splitlines()
+    # Current status of all groups, one query
+    if status is None:
+        status = parse_status_report(xps)
     for group in CONFIG["GROUPS"]:
-        already_initialized = False
-        # Search for group status in the report
-        for line in status_lines:
-             # Typical format: SP1 (ID 0): Ready from homing, Referenced, Enabled, ...
-            if line.startswith(f"{group} ("):
-                # Look for the "Referenced" or "Ready" keyword, meaning initialized
-                if "Referenced" in line or "Ready" in line or "Enabled" in line:
-                    already_initialized = True
-                break
-        if already_initialized:
+        # Typical format: SP1 (ID 0): Ready from homing, Referenced, Enabled, ...
+        line = status.get(group, "")
+        # Look for the "Referenced" or "Ready" keyword, meaning initialized
+        if "Referenced" in line or "Ready" in line or "Enabled" in line:
+            _prep_state["initialized"].add(group)
             if verbose:
-                print(f"ℹ️ {group} already initialized.")
+                logger.info("ℹ️ %s already initialized.", group)
             continue
 
         try:
             xps.initialize_group(group)
+            _prep_state["initialized"].add(group)
             if verbose:
-                print(f"✅ {group} initialized.")
+                logger.info("✅ %s initialized.", group)
         except Exception as e:
             msg = str(e)
             # Only print unexpected errors; suppress 'Not allowed action'
             if "Not allowed action" in msg:
+                _prep_state["initialized"].add(group)
                 if verbose:
-                    print(f"ℹ️ {group} already initialized (from exception).")
+                    logger.info("ℹ️ %s already initialized (from exception).", group)
             else:
-                print(f"❌ Failed to initialize {group}: {e}")
+                logger.error("❌ Failed to initialize %s: %s", group, e)
 
 
-def enable_groups(xps, verbose=False):
+def enable_groups(xps, verbose=False, status=None):
+    if _groups_done("enabled"):
+        if verbose:
+            logger.info("ℹ️ All groups already enabled in this session.")
+        return
+    invalidate_ready_cache()
     if verbose:
-        print("⚡ Enabling motion...")
-    # Get current status report for all groups
-    status_lines = xps.status_report().splitlines()
+        logger.info("⚡ Enabling motion...")
+    # Current status of all groups, one query
+    if status is None:
+        status = parse_status_report(xps)
 
     for group in CONFIG["GROUPS"]:
-        already_enabled = False
-        for line in status_lines:
-            if line.startswith(f"{group} ("):
-                # Try to match both "Enabled" and common state names (for robustness)
-                if "Enabled" in line:
-                    already_enabled = True
-                break
-        if already_enabled:
+        if "Enabled" in status.get(group, ""):
+            _prep_state["enabled"].add(group)
             if verbose:
-                print(f"ℹ️ {group} already enabled.")
+                logger.info("ℹ️ %s already enabled.", group)
             continue
 
         try:
             xps.enable_group(group)
+            _prep_state["enabled"].add(group)
             if verbose:
-                print(f"✅ {group} motion enabled.")
+                logger.info("✅ %s motion enabled.", group)
         except Exception as e:
             msg = str(e)
             # Only print unexpected errors; suppress the known 'Not allowed action'
             if "Not allowed action" in msg:
+                _prep_state["enabled"].add(group)
                 if verbose:
-                    print(f"ℹ️ {group} already enabled (from exception).")
+                    logger.info("ℹ️ %s already enabled (from exception).", group)
             else:
-                print(f"❌ Enable error for {group}: {e}")
+                logger.error("❌ Enable error for %s: %s", group, e)
+    _save_ready_state_if_prepared()
+
+def prepare_groups(xps, force_home=False, enable=True, verbose=False, status=None):
+    """
+    Initialize, home and (optionally) enable every configured group in one pass.
+
+    Equivalent to initialize_groups + home_groups + enable_groups, but the
+    status report is fetched once and each group only receives the commands
+    it still needs. A group that has just been homed is left ready by the
+    controller, so it is not sent a separate enable.
+    status: optional result of parse_status_report(xps), to skip the query.
+    """
+    steps = ["initialized", "homed"] + (["enabled"] if enable else [])
+    if not force_home and all(_groups_done(step) for step in steps):
+        if verbose:
+            logger.info("ℹ️ All groups already prepared in this session.")
+        return
+    invalidate_ready_cache()
+    if verbose:
+        logger.info("⚙️ Preparing groups (initialize, home%s", ", enable)..." if enable else ")...")
+
+    if status is None:
+        status = parse_status_report(xps)
+    for group in CONFIG["GROUPS"]:
+        line = status.get(group, "")
+
+        just_initialized = False
+        if "Referenced" in line or "Ready" in line or "Enabled" in line:
+            _prep_state["initialized"].add(group)
+        else:
+            try:
+                xps.initialize_group(group)
+                just_initialized = True
+                if verbose:
+                    logger.info("✅ %s initialized.", group)
+            except Exception as e:
+                if "Not allowed action" not in str(e):
+                    logger.error("❌ Failed to initialize %s: %s", group, e)
+                    continue
+            _prep_state["initialized"].add(group)
+
+        just_homed = False
+        if just_initialized or "Not referenced" in line:
+            try:
+                xps.home_group(group)
+                just_homed = True
+                if verbose:
+                    logger.info("✅ %s homed.", group)
+            except Exception as e:
+                logger.error("❌ Failed to home %s: %s", group, e)
+                continue
+        _prep_state["homed"].add(group)
+
+        if not enable:
+            continue
+        if not just_homed and "Enabled" not in line:
+            try:
+                xps.enable_group(group)
+                if verbose:
+                    logger.info("✅ %s motion enabled.", group)
+            except Exception as e:
+                if "Not allowed action" not in str(e):
+                    logger.error("❌ Enable error for %s: %s", group, e)
+                    continue
+        _prep_state["enabled"].add(group)
+    if enable:
+        _save_ready_state_if_prepared()
 
 def reset_stages(xps, verbose=False):
+    invalidate_ready_cache()
+    reset_pos = CONFIG["RESET_POSITION"]
+    tol = CONFIG["POSITION_TOL"]
     if verbose:
-        print(f"🔁 Resetting active stages to {CONFIG['RESET_POSITION']}...")
-    for stage in get_active_stages():
+        logger.info("🔁 Resetting active stages to %s...", reset_pos)
+    # One query per XPS group instead of one per stage
+    current = get_stage_positions_with_offset(xps, get_active_stages())
+    for stage, pos in current.items():
         try:
-            pos = get_stage_position_with_offset(xps, stage)
             if pos is None:
-                print(f"⚠️ Could not get position of {stage} to reset.")
+                logger.warning("⚠️ Could not get position of %s to reset.", stage)
                 continue
-            if abs(pos - CONFIG["RESET_POSITION"]) < CONFIG["POSITION_TOL"]:
+            if abs(pos - reset_pos) < tol:
                 if verbose:
-                    print(f"✅ {stage} already at {CONFIG['RESET_POSITION']:.2f}")
+                    logger.info("✅ %s already at %.2f", stage, reset_pos)
             else:
                 if verbose:
-                    print(f"➡ Moving {stage} to {CONFIG['RESET_POSITION']}...")
-                move_stage_with_offset(xps, stage, CONFIG["RESET_POSITION"])
+                    logger.info("➡ Moving %s to %s...", stage, reset_pos)
+                move_stage_with_offset(xps, stage, reset_pos)
                 if verbose:
-                    print(f"✅ {stage} reset")
+                    logger.info("✅ %s reset", stage)
         except Exception as e:
-            print(f"❌ Failed to reset {stage}: {e}")
+            logger.error("❌ Failed to reset %s: %s", stage, e)
 
 def kill_all_groups(xps, verbose=False):
     """
     Kill all groups: brings axes to 'Not Initialized' (safe shutdown).
     """
+    forget_ready_state()
     for group in CONFIG["GROUPS"]:
         try:
             xps.kill_group(group)
             if verbose:
-                print(f"🛑 Killed {group}")
+                logger.info("🛑 Killed %s", group)
         except Exception as e:
             if verbose:
-                print(f"❌ Error killing {group}: {e}")
+                logger.error("❌ Error killing %s: %s", group, e)
 
-def wait_until_reached(xps, targets):
+def motion_done(xps, group, sid=None):
+    """
+    True when no positioner of `group` is moving, per the controller's
+    GroupMotionStatusGet (0 = stopped). One short query per group.
+    """
+    n = len(xps.groups.get(group, {}).get("positioners", [])) or 1
+    outputs = ",".join(["int *"] * n)
+    err, msg = xps._xps.Send(xps._sid if sid is None else sid,
+                             f"GroupMotionStatusGet({group},{outputs})")
+    xps.check_error(err, msg=f"Get Motion Status '{group}'")
+    return all(int(v) == 0 for v in msg.split(","))
+
+def _pooled_motion_done(sid, xps, group):
+    return motion_done(xps, group, sid=sid)
+
+def groups_motion_done(xps, groups):
+    """True once none of `groups` is moving. The groups are queried concurrently."""
+    pool = get_pool(xps)
+    futs = [pool.submit(_pooled_motion_done, xps, group) for group in groups]
+    return all([fut.result() for fut in futs])
+
+def _groups_of(stages):
+    return list(dict.fromkeys(stage.split(".", 1)[0] for stage in stages))
+
+def wait_until_reached(xps, targets, stages=None):
+    """
+    Wait until `stages` (default: the active stages) are within POSITION_TOL
+    of `targets`.
+
+    Polls one motion-status flag per group; positions are read only once the
+    groups report that motion is done.
+    Returns False if MAX_WAIT_TIME elapses first.
+    """
+    if stages is None:
+        stages = get_active_stages()
+    groups = _groups_of(stages)
+    pairs = list(zip(stages, targets))
+    tol = CONFIG["POSITION_TOL"]
+    delay = CONFIG["WAIT_DELAY"]
+    max_wait = CONFIG["MAX_WAIT_TIME"]
+    status_failed = False
     start_time = time.time()
-    stages = get_active_stages()
-    while time.time() - start_time < CONFIG["MAX_WAIT_TIME"]:
-        all_reached = True
-        for stage, target in zip(stages, targets):
-            try:
-                pos = get_stage_position_with_offset(stage)
-                if pos is None or abs(pos - target) > CONFIG["POSITION_TOL"]:
-                    all_reached = False
-                    break
-            except Exception:
-                return False
-        if all_reached:
-            return True
-        time.sleep(CONFIG["WAIT_DELAY"])
+    while time.time() - start_time < max_wait:
+        try:
+            done = groups_motion_done(xps, groups)
+        except Exception as e:
+            # Status query failed: fall back to checking positions, but say so once
+            if not status_failed:
+                logger.warning("⚠️ Motion status query failed (%s); polling positions instead.", e)
+                status_failed = True
+            done = True
+        if done:
+            current = get_stage_positions_with_offset(xps, stages, use_cache=True, ttl=POLL_CACHE_TTL)
+            # A failed read (None) counts as not reached; keep polling until timeout.
+            if all(current[s] is not None and abs(current[s] - t) <= tol for s, t in pairs):
+                return True
+        time.sleep(delay)
+    forget_ready_state()  # a stuck stage may mean a group dropped out of Ready
     return False
 
 def wait_until_reached_blocking(xps, targets, stages=None, tolerance=None, poll_delay=None):
-    from .xps_config import CONFIG, get_active_stages
+    """
+    Block until the groups of `stages` stop moving, then check that every
+    stage is within `tolerance` of its target.
+
+    Only one motion-status flag per group is polled while moving; positions
+    are read once at the end. Returns False on a failed query or if a stage
+    stopped outside the tolerance.
+    """
     if stages is None:
         stages = get_active_stages()
     tol = tolerance if tolerance is not None else CONFIG["POSITION_TOL"]
     delay = poll_delay if poll_delay is not None else CONFIG["WAIT_DELAY"]
+    pairs = list(zip(stages, targets))
+    groups = _groups_of(s for s, _ in pairs)
     while True:
-        all_reached = True
-        for stage, target in zip(stages, targets):
-            try:
-                pos = get_stage_position_with_offset(xps, stage)
-                if pos is None or abs(pos - target) > tol:
-                    all_reached = False
-                    break
-            except Exception:
-                return False
-        if all_reached:
-            return True
+        try:
+            if groups_motion_done(xps, groups):
+                break
+        except Exception:
+            # There is no timeout here, so give up instead of spinning
+            forget_ready_state()
+            return False
         time.sleep(delay)
 
-def execute_position_configurations(xps, combinations, log_file=None):
+    # Same reader as wait_until_reached: failed reads are logged there and map to None
+    current = get_stage_positions_with_offset(xps, [s for s, _ in pairs])
+    reached = all(current[s] is not None and abs(current[s] - t) <= tol for s, t in pairs)
+    if not reached:
+        forget_ready_state()
+    return reached
+
+# Sweeps longer than this run quietly unless verbose=True is passed
+QUIET_SWEEP_THRESHOLD = 100
+
+def execute_position_configurations(xps, combinations, log_file=None, verbose=None):
+    """
+    Move through each position combination and wait for it to be reached.
+    log_file: optional CSV log, either an open writer with a write(positions)
+              method (e.g. a CsvLogger reused across --loop passes) or a path.
+              A path is opened once for the whole call, not once per row.
+    combinations: any iterable of position lists (a generator is consumed lazily).
+    verbose: print a line per configuration. Default: only for sweeps of at
+             most QUIET_SWEEP_THRESHOLD configurations (or of unknown length);
+             longer sweeps show a progress bar instead (if tqdm is installed).
+             Errors and timeouts are always logged.
+    """
+    total = len(combinations) if hasattr(combinations, "__len__") else None
+    if verbose is None:
+        verbose = total is None or total <= QUIET_SWEEP_THRESHOLD
+    owns_log = log_file is not None and not hasattr(log_file, "write")
+    log = CsvLogger(log_file) if owns_log else log_file
+    # Resolved once for the whole sweep, not per configuration
     stages = get_active_stages()
-    for idx, positions in enumerate(combinations, start=1):
-        print(f"\n➡ Moving to configuration {idx}: {positions}")
-        for stage, pos in zip(stages, positions):
-            try:
-                move_stage_with_offset(xps, stage, pos)
-            except Exception as e:
-                print(f"❌ Error moving {stage}: {e}")
-
-        success = wait_until_reached(xps, positions)
-        status_line = " | ".join(f"{s}={p:.2f}" for s, p in zip(stages, positions))
-        if success:
-            print(f"✅ Reached: {status_line}")
-            if log_file:
-                append_to_log(log_file, positions)
-        else:
-            print(f"⚠️ Timeout: {status_line}")
+    offsets = [CONFIG["ZERO_OFFSETS"].get(s, 0.0) for s in stages]
+    rows = enumerate(combinations, start=1)
+    if not verbose and tqdm is not None:
+        rows = tqdm(rows, total=total, unit="config")
+    try:
+        for idx, positions in rows:
+            if verbose:
+                logger.info("\n➡ Moving to configuration %s: %s", idx, positions)
+            hw_targets = [p + o for p, o in zip(positions, offsets)]
+            for name, e in dispatch_moves(xps, stages, hw_targets, hardware=True):
+                logger.error("❌ Error moving %s: %s", name, e)
+
+            success = wait_until_reached(xps, positions, stages=stages)
+            if success:
+                if verbose:
+                    status_line = " | ".join(f"{s}={p:.2f}" for s, p in zip(stages, positions))
+                    logger.info("✅ Reached: %s", status_line)
+                if log:
+                    log.write(positions)
+            else:
+                status_line = " | ".join(f"{s}={p:.2f}" for s, p in zip(stages, positions))
+                logger.warning("⚠️ Timeout at configuration %s: %s", idx, status_line)
+    finally:
+        if owns_log:
+            log.close()
 
 def append_to_log(filename, positions):
+    """
+    Append a single timestamped row to a CSV log (opens and closes the file).
+    For repeated rows use CsvLogger, which keeps one buffered handle open.
+    """
     try:
         with open(filename, "a", newline="") as f:
             writer = csv.writer(f)
             writer.writerow([datetime.now().isoformat()] + positions)
     except Exception as e:
-        print(f"❌ Failed to write to log: {e}")
+        logger.error("❌ Failed to write to log: %s", e)
+
+class CsvLogger:
+    """
+    Background CSV writer for position logs.
+
+    write() only queues the row with an integer time.time_ns() stamp; a daemon
+    thread formats the ISO timestamps (date/time part cached per second),
+    appends queued rows in batches and flushes after each batch, so the
+    motion loop never waits on disk I/O or string formatting.
+    Rows of plain floats/ints are joined directly; other rows go through
+    csv.writer for quoting. Both produce the same text for numeric rows.
+    Call close() (or use as a context manager) to flush and stop the thread.
+    """
+    _STOP = object()
+
+    def __init__(self, path, batch_size=128):
+        self.path = path
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._file = open(path, "a", newline="", buffering=8192)
+        self._writer = csv.writer(self._file)
+        self._ts_sec = None
+        self._ts_prefix = ""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, positions):
+        """Queue one row: current timestamp followed by the positions."""
+        self._queue.put((time.time_ns(), list(positions)))
+
+    def _timestamp(self, ns):
+        # Local ISO time with microseconds; the seconds part is formatted once per second
+        sec, rem = divmod(ns, 1_000_000_000)
+        if sec != self._ts_sec:
+            self._ts_sec = sec
+            self._ts_prefix = datetime.fromtimestamp(sec).isoformat()
+        return f"{self._ts_prefix}.{rem // 1000:06d}"
+
+    def _write_batch(self, batch):
+        lines = []
+        for ns, pos in batch:
+            row = [self._timestamp(ns)]
+            if all(type(p) is float or type(p) is int for p in pos):
+                # Same text as csv.writer: repr() of each number, "\r\n" line end
+                row.extend(map(repr, pos))
+                lines.append(",".join(row) + "\r\n")
+            else:
+                self._file.write("".join(lines))
+                lines.clear()
+                self._writer.writerow(row + pos)
+        self._file.write("".join(lines))
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = batch[-1] is self._STOP
+            if stop:
+                batch.pop()
+            try:
+                self._write_batch(batch)
+                self._file.flush()
+            except Exception as e:
+                logger.error("❌ Failed to write to log: %s", e)
+            if stop:
+                return
+
+    def close(self):
+        """Write out all queued rows and close the file."""
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
 # ------------------------
 # New helper functions to apply zero offset transparently
@@ -252,15 +696,212 @@ def move_stage_with_offset(xps, stage, position):
     """
     zero_offset = CONFIG["ZERO_OFFSETS"].get(stage, 0.0)
     target = position + zero_offset
-    xps.move_stage(stage, target)
+    _position_cache.invalidate((stage,))
+    try:
+        xps.move_stage(stage, target)
+    except Exception:
+        forget_ready_state()
+        raise
 
-def get_stage_position_with_offset(xps, stage):
+def get_stage_position_with_offset(xps, stage, use_cache=False, ttl=None):
     """
     Get the current position of a stage relative to its zero offset.
     Returns hardware position minus zero offset.
+    use_cache: return a position read within `ttl` seconds (default
+               POSITION_CACHE_TTL) instead of querying the controller.
     """
+    if use_cache:
+        cached = _position_cache.get(stage, ttl)
+        if cached is not None:
+            return cached
     zero_offset = CONFIG["ZERO_OFFSETS"].get(stage, 0.0)
-    pos_hw = xps.get_stage_position(stage)
+    try:
+        pos_hw = xps.get_stage_position(stage)
+    except Exception:
+        forget_ready_state()
+        raise
     if pos_hw is None:
+        forget_ready_state()
         return None
-    return pos_hw - zero_offset
\ No newline at end of file
+    pos = pos_hw - zero_offset
+    _position_cache.put(stage, pos)
+    return pos
+
+# Per-stage commands below run on pooled sockets (see xps_pool) so that
+# independent stages do not queue behind one another on the client socket.
+
+def _pooled_stage_position(sid, xps, stage):
+    if stage not in xps.stages:
+        raise ValueError(f"Stage '{stage}' not found")
+    err, val = xps._xps.GroupPositionCurrentGet(sid, stage, 1)
+    xps.check_error(err, msg=f"Get Stage Position '{stage}'")
+    return val - CONFIG["ZERO_OFFSETS"].get(stage, 0.0)
+
+def get_group_positions(xps, group, sid=None):
+    """
+    Read every positioner of an XPS group with one GroupPositionCurrentGet call.
+    Returns {stage_name: hardware position} (zero offsets NOT applied).
+    """
+    positioners = xps.groups[group]["positioners"]
+    err, *values = xps._xps.GroupPositionCurrentGet(
+        xps._sid if sid is None else sid, group, len(positioners))
+    xps.check_error(err, msg=f"Get Group Position '{group}'")
+    return {f"{group}.{p}": v for p, v in zip(positioners, values)}
+
+def _pooled_group_positions(sid, xps, group):
+    return get_group_positions(xps, group, sid=sid)
+
+def get_stage_positions_with_offset(xps, stages, use_cache=False, ttl=None):
+    """
+    Read the positions of several stages concurrently, relative to their zero offsets.
+
+    Stages of a multi-axis group are read with a single group query; if that
+    query fails, those stages are read one by one instead.
+    use_cache: reuse positions read within `ttl` seconds (default
+               POSITION_CACHE_TTL) and only query the remaining stages.
+    Returns {stage: position} in the order of `stages`; failed reads map to None.
+    """
+    positions = {stage: None for stage in stages}
+    if use_cache:
+        for stage in positions:
+            positions[stage] = _position_cache.get(stage, ttl)
+    to_read = [stage for stage, pos in positions.items() if pos is None]
+    if not to_read:
+        return positions
+    by_group = {}
+    for stage in to_read:
+        by_group.setdefault(stage.split(".", 1)[0], []).append(stage)
+
+    pool = get_pool(xps)
+    futs = {}  # future -> (group name or None, stages it covers)
+    for group, members in by_group.items():
+        if len(xps.groups.get(group, {}).get("positioners", [])) > 1:
+            futs[pool.submit(_pooled_group_positions, xps, group)] = (group, members)
+        else:
+            for stage in members:
+                futs[pool.submit(_pooled_stage_position, xps, stage)] = (None, [stage])
+
+    offsets = CONFIG["ZERO_OFFSETS"]
+    retry = []
+    for fut in as_completed(futs):
+        group, members = futs[fut]
+        try:
+            result = fut.result()
+        except Exception as e:
+            if group is not None:
+                retry.extend(members)
+            else:
+                logger.error("❌ Failed to get position of %s: %s", members[0], e)
+            continue
+        if group is None:
+            positions[members[0]] = result
+        else:
+            for stage in members:
+                positions[stage] = result[stage] - offsets.get(stage, 0.0)
+
+    # Fallback: per-stage reads for groups whose batched query failed
+    futs = {pool.submit(_pooled_stage_position, xps, s): s for s in retry}
+    for fut in as_completed(futs):
+        stage = futs[fut]
+        try:
+            positions[stage] = fut.result()
+        except Exception as e:
+            logger.error("❌ Failed to get position of %s: %s", stage, e)
+    if any(positions[stage] is None for stage in to_read):
+        forget_ready_state()
+    for stage in to_read:
+        _position_cache.put(stage, positions[stage])
+    return positions
+
+def _pooled_move(sid, xps, name, hw_targets):
+    err, _ = xps._xps.GroupMoveAbsolute(sid, name, hw_targets)
+    xps.check_error(err, msg=f"Moving '{name}'")
+
+def _pooled_group_moves(sid, xps, moves):
+    """Send the moves of one group in order; returns [(name, exception)] for the failed ones."""
+    errors = []
+    for name, hw_targets in moves:
+        try:
+            _pooled_move(sid, xps, name, hw_targets)
+        except Exception as e:
+            errors.append((name, e))
+    return errors
+
+def batch_move(xps, stage_to_pos, hardware=False):
+    """
+    Move several stages at once (positions relative to zero offsets).
+
+    Stages are bucketed by XPS group. A multi-axis group whose positioners are
+    all requested gets one GroupMoveAbsolute carrying every target; otherwise
+    its stages are moved one after another, since the controller refuses a
+    move on a group that is already moving. Different groups are dispatched
+    concurrently and a failing command does not cancel the others.
+
+    Arguments:
+        stage_to_pos: {stage_name: position}
+        hardware: if True, positions already include the zero offsets.
+    Returns:
+        list of (stage or group name, exception) for the commands that failed.
+    """
+    by_group = {}
+    for stage, pos in stage_to_pos.items():
+        by_group.setdefault(stage.split(".", 1)[0], {})[stage] = pos
+
+    offsets = {} if hardware else CONFIG["ZERO_OFFSETS"]
+    errors = []
+    jobs = []  # one list of (group or stage name, hardware targets) per group
+    _position_cache.invalidate(stage_to_pos)
+    for group, targets in by_group.items():
+        positioners = xps.groups.get(group, {}).get("positioners", [])
+        names = [f"{group}.{p}" for p in positioners]
+        if len(names) > 1 and set(names) == set(targets):
+            jobs.append([(group, [targets[n] + offsets.get(n, 0.0) for n in names])])
+            continue
+        moves = []
+        for stage, pos in targets.items():
+            if stage not in xps.stages:
+                errors.append((stage, ValueError(f"Stage '{stage}' not found")))
+            else:
+                moves.append((stage, [pos + offsets.get(stage, 0.0)]))
+        if moves:
+            jobs.append(moves)
+
+    if not jobs:
+        return errors
+    pool = get_pool(xps)
+    futs = {pool.submit(_pooled_group_moves, xps, moves): moves for moves in jobs}
+    for fut in as_completed(futs):
+        try:
+            errors.extend(fut.result())
+        except Exception as e:
+            errors.extend((name, e) for name, _ in futs[fut])
+    if errors:
+        forget_ready_state()
+    return errors
+
+def dispatch_moves(xps, stages, positions, hardware=False):
+    """
+    Send move commands for several stages (positions relative to zero offsets,
+    or hardware positions if `hardware` is True).
+
+    With CONFIG["PARALLEL_DISPATCH"] (the default, "parallel_dispatch" in the
+    hardware file) the commands go out concurrently through batch_move;
+    otherwise they are sent one after another on the client socket.
+    A failing stage does not cancel the others.
+    Returns a list of (stage or group name, exception) for the moves that failed.
+    """
+    if CONFIG["PARALLEL_DISPATCH"]:
+        return batch_move(xps, dict(zip(stages, positions)), hardware=hardware)
+    errors = []
+    for stage, pos in zip(stages, positions):
+        try:
+            if hardware:
+                _position_cache.invalidate((stage,))
+                xps.move_stage(stage, pos)
+            else:
+                move_stage_with_offset(xps, stage, pos)
+        except Exception as e:
+            errors.append((stage, e))
+    if errors:
+        forget_ready_state()
+    return errors
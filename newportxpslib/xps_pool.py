@@ -0,0 +1,114 @@
+"""
+xps_pool.py
+
+Pool of extra command sockets on one Newport XPS controller.
+
+The XPS answers one command at a time per socket, and motion commands only
+return once the move is done, so per-stage commands sent over a single
+connection always run one after another. A few additional logged-in sockets
+on the same client let independent commands (position reads, moves on
+different stages) run concurrently.
+
+- XPSPool: logged-in sockets plus a thread pool that lends one socket per task
+- get_pool: the pool attached to a NewportXPS client (created on first use)
+- close_pool: close a client's pool, if it has one
+"""
+import atexit
+import queue
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from newportxpslib.xps_connection import tune_xps_socket
+
+DEFAULT_POOL_SIZE = 4
+
+_pools = weakref.WeakKeyDictionary()
+_pools_lock = threading.Lock()
+
+
+class XPSPool:
+    """
+    Fixed set of authenticated sockets to the controller of `xps`.
+
+    submit(fn, *args) runs fn(sid, *args) on a worker thread with an idle
+    socket id checked out for the duration of the call.
+    If the controller refuses extra sockets, the client's own socket is lent
+    to a single worker, so commands are still safe, just not concurrent.
+    """
+
+    def __init__(self, xps, size=DEFAULT_POOL_SIZE):
+        self.xps = xps
+        self._sids = []
+        self._idle = queue.Queue()
+        for _ in range(size):
+            sid = self._open_socket()
+            if sid is None:
+                break
+            self._sids.append(sid)
+            self._idle.put(sid)
+        if not self._sids:
+            self._idle.put(xps._sid)
+        self.size = max(len(self._sids), 1)
+        self._executor = ThreadPoolExecutor(max_workers=self.size)
+
+    def _open_socket(self):
+        drv = self.xps._xps
+        sid = drv.TCP_ConnectToServer(self.xps.host, self.xps.port, self.xps.timeout)
+        if sid is None or sid < 0:
+            return None
+        try:
+            err, _ = drv.Login(sid, self.xps.username, self.xps.password)
+        except Exception:
+            err = -1
+        if err != 0:
+            drv.TCP_CloseSocket(sid)
+            return None
+        tune_xps_socket(self.xps, sid)
+        return sid
+
+    def _run(self, fn, args):
+        sid = self._idle.get()
+        try:
+            return fn(sid, *args)
+        finally:
+            self._idle.put(sid)
+
+    def submit(self, fn, *args):
+        """Run fn(sid, *args) on a pooled socket. Returns a Future."""
+        return self._executor.submit(self._run, fn, args)
+
+    def close(self):
+        """Wait for running tasks, then close the pooled sockets."""
+        self._executor.shutdown(wait=True)
+        for sid in self._sids:
+            self.xps._xps.TCP_CloseSocket(sid)
+        self._sids = []
+
+
+def get_pool(xps, size=DEFAULT_POOL_SIZE):
+    """Return the socket pool for `xps`, opening it on first use."""
+    with _pools_lock:
+        pool = _pools.get(xps)
+        if pool is None:
+            pool = _pools[xps] = XPSPool(xps, size=size)
+    return pool
+
+
+def close_pool(xps):
+    """Close the socket pool of `xps`, if one was opened."""
+    with _pools_lock:
+        pool = _pools.pop(xps, None)
+    if pool is not None:
+        pool.close()
+
+
+def _close_all_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+atexit.register(_close_all_pools)
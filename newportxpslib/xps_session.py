@@ -1,3 +1,20 @@
+import logging
+
+from newportxps import NewportXPS
+
+from .xps_config import load_full_config, load_user_credentials, CONFIG
+from .xps_connection import tune_xps_socket, _safe_close
+from .xps_motion import (
+    CsvLogger, dispatch_moves, wait_until_reached_blocking,
+    get_stage_positions_with_offset, initialize_groups, home_groups, enable_groups,
+    prepare_groups, kill_all_groups, parse_status_report,
+    load_ready_state, assume_groups_ready,
+)
+from .utils import resolve_stages
+
+logger = logging.getLogger(__name__)
+
+
 class XPSMotionSession:
     """
     Session object for robust, efficient Newport XPS control.
@@ -9,89 +26,105 @@ class XPSMotionSession:
     - Handles out-of-range or not-enabled/homed errors gracefully.
     """
 
-    def __init__(self, stages=None, verbose=False):
+    def __init__(self, stages=None, verbose=False, trust_cache=True):
         """
         Initialize the session and connect to XPS.
 
         Arguments:
             stages: list of stage names (str) or numbers (int, 1-based). Default: all stages.
             verbose: print extra diagnostics.
+            trust_cache: if a previous session left all groups prepared less than
+                         an hour ago (~/.xps_state.json), answer the first
+                         readiness check from that record instead of querying.
+                         Explicit initialize/home/enable/prepare calls always
+                         check the controller. Any failed move, read or wait
+                         drops the record.
         """
-        from .xps_config import (
-            load_full_config, load_user_credentials, CONFIG
-        )
-        from newportxps import NewportXPS
-        
         load_user_credentials()
         self.config = load_full_config(verbose=True)
         
         # ---- Interpret 'stages' (support names or 1-based numbers) ----
-        if stages is not None:
-            self.stages = []
-            for s in stages:
-                if isinstance(s, int):
-                    if s <= 0 or s > len(CONFIG["STAGES"]):
-                        raise ValueError(f"Stage number {s} out of range.")
-                    self.stages.append(CONFIG["STAGES"][s - 1])
-                elif isinstance(s, str):
-                    if s not in CONFIG["STAGES"]:
-                        raise ValueError(f"Stage name '{s}' not found.")
-                    self.stages.append(s)
-                else:
-                    raise ValueError(f"Stage specifier must be int or str, got: {s}")
-        else:
-            self.stages = CONFIG["STAGES"]
+        # Same validation as the procedural API (see utils.resolve_stages)
+        self.stages = resolve_stages(stages) if stages is not None else CONFIG["STAGES"]
 
         # ---- Connect to controller once ----    
-        print(f"🔌 Connecting to XPS at {CONFIG['XPS_IP']}...")
+        logger.info("🔌 Connecting to XPS at %s...", CONFIG['XPS_IP'])
         self.xps = NewportXPS(CONFIG["XPS_IP"], 
             username=CONFIG["USERNAME"], 
             password=CONFIG["PASSWORD"])
-        print("✅ Connected.")
+        tune_xps_socket(self.xps)
+        logger.info("✅ Connected.")
 
         self.verbose = verbose
+        self.trust_cache = trust_cache
+        if trust_cache:
+            if load_ready_state():
+                assume_groups_ready(self.xps)
+                if verbose:
+                    logger.info("ℹ️ Groups were left prepared by a previous session; skipping the readiness check.")
+        self._refresh_offsets()
+        self.log_writer = None  # CsvLogger shared by all moves of this session (see open_log)
+
+    def _refresh_offsets(self):
+        """Zero offsets of self.stages as a list, in the same order."""
+        self._offsets_src = CONFIG["ZERO_OFFSETS"]
+        self._offsets = [self._offsets_src.get(s, 0.0) for s in self.stages]
+
+    def open_log(self, path):
+        """
+        Log the positions of every completed move to the CSV file `path`.
+        The file is opened once and kept open (buffered) until close().
+        Returns the session's log writer, so scripts can add their own rows.
+        """
+        if self.log_writer is not None:
+            self.log_writer.close()
+        self.log_writer = CsvLogger(path)
+        return self.log_writer
 
     def kill_all_groups(self):
         """
         Kill all motion groups, bringing all axes to the Not Initialized state.
         This is the safest possible shutdown state.
         """
-        from .xps_motion import kill_all_groups
-        print("🛑 Killing all groups (bringing system to NOT INITIALIZED state)...")
+        logger.info("🛑 Killing all groups (bringing system to NOT INITIALIZED state)...")
         kill_all_groups(self.xps, verbose=self.verbose)
-        print("🔴 All groups killed (not initialized).")
+        logger.info("🔴 All groups killed (not initialized).")
+
+    def group_status(self):
+        """
+        Query the controller status once; returns {group: status line}.
+        Pass the result as `status=` to the group methods below to reuse it.
+        """
+        return parse_status_report(self.xps)
 
-    def initialize_groups(self):
+    def initialize_groups(self, status=None):
         """Initialize all groups (prepares for homing, but cannot move yet)."""
-        from .xps_motion import initialize_groups
-        print("🔄 Initializing all groups...")
-        initialize_groups(self.xps, verbose=self.verbose)
-        print("🟡 All groups initialized (ready to home).")
+        logger.info("🔄 Initializing all groups...")
+        initialize_groups(self.xps, verbose=self.verbose, status=status)
+        logger.info("🟡 All groups initialized (ready to home).")
 
-    def home_groups(self, force_home=True):
+    def home_groups(self, force_home=True, status=None):
         """Home all groups (brings axes to referenced state)."""
-        from .xps_motion import home_groups
-        print("🏠 Homing all groups...")
-        home_groups(self.xps, force_home=force_home, verbose=self.verbose)
-        print("🟢 All groups homed (referenced).")
+        logger.info("🏠 Homing all groups...")
+        home_groups(self.xps, force_home=force_home, verbose=self.verbose, status=status)
+        logger.info("🟢 All groups homed (referenced).")
 
-    def enable_groups(self):
+    def enable_groups(self, status=None):
         """Enable all groups (axes ready to move)."""
-        from .xps_motion import enable_groups
-        print("⚡ Enabling all groups...")
-        enable_groups(self.xps, verbose=self.verbose)
-        print("🟢 All groups enabled (ready to move).")
+        logger.info("⚡ Enabling all groups...")
+        enable_groups(self.xps, verbose=self.verbose, status=status)
+        logger.info("🟢 All groups enabled (ready to move).")
 
     def prepare_groups(self, force_home=True):
         """
         Fully prepare all groups for motion: initialize and home (in this order).
         (Enabling is not required for most Newport XPS hardware/firmware.)
         """
-        self.initialize_groups()
-        self.home_groups(force_home=force_home)
-        print("🟢 Groups fully prepared for motion (initialized and homed).")
+        logger.info("🔄 Initializing and homing all groups...")
+        prepare_groups(self.xps, force_home=force_home, enable=False, verbose=self.verbose)
+        logger.info("🟢 Groups fully prepared for motion (initialized and homed).")
     
-    def move_motors(self, *positions, verbose=False, ensure_prep=True):
+    def move_motors(self, *positions, verbose=None, ensure_prep=True):
         """
         Move all session stages to given absolute positions (with zero offsets).
 
@@ -104,76 +137,73 @@ class XPSMotionSession:
         Returns:
             True if all moves succeeded and all reached targets, False otherwise.
         """
-        from .xps_motion import (
-            move_stage_with_offset, wait_until_reached_blocking
-        )
-
         if len(positions) != len(self.stages):
             raise ValueError(f"Expected {len(self.stages)} positions, got {len(positions)}.")
 
         if verbose is None:
             verbose = self.verbose
-        
-        move_targets = ", ".join(f"{stage} → {pos}" 
-                            for stage, pos in zip(self.stages, positions))
-        print(f"➡ Moving: {move_targets}")
-        
-        move_failed = False  # Track if any move failed
-        for stage, pos in zip(self.stages, positions):
-            try:
-                move_stage_with_offset(self.xps, stage, pos)
-            except Exception as e:
-                print(f"❌ Error moving {stage}: {e}")
-                # Typical errors: Not allowed action (not enabled), out of range, etc.
-                if "Not allowed action" in str(e) or "not enabled" in str(e) or "not referenced" in str(e):
-                    print(f"⚠️ Stage '{stage}' is not enabled/homed. Please run initialization once before motion.")
-                move_failed = True
-
-        if move_failed:
-            print("❌ One or more move commands failed. Skipping wait for completion.")
+
+        # Only build the target summary when it is printed (tight sweeps run quiet)
+        if verbose:
+            move_targets = ", ".join(f"{stage} → {pos}"
+                                for stage, pos in zip(self.stages, positions))
+            logger.info("➡ Moving: %s", move_targets)
+
+        # Offsets are precomputed per session; reloading the config (e.g. after
+        # set_zero_for_stages) replaces ZERO_OFFSETS, which triggers a refresh.
+        if self._offsets_src is not CONFIG["ZERO_OFFSETS"]:
+            self._refresh_offsets()
+        hw_targets = [p + o for p, o in zip(positions, self._offsets)]
+
+        # Move commands go out concurrently on pooled sockets (see dispatch_moves)
+        errors = dispatch_moves(self.xps, self.stages, hw_targets, hardware=True)
+        for stage, e in errors:
+            logger.error("❌ Error moving %s: %s", stage, e)
+            # Typical errors: Not allowed action (not enabled), out of range, etc.
+            if "Not allowed action" in str(e) or "not enabled" in str(e) or "not referenced" in str(e):
+                logger.warning("⚠️ Stage '%s' is not enabled/homed. Please run initialization once before motion.", stage)
+
+        if errors:
+            logger.error("❌ One or more move commands failed. Skipping wait for completion.")
             return False
 
         reached = wait_until_reached_blocking(self.xps, positions, stages=self.stages)
         if reached:
-            print("✅ Reached all target positions.")
+            if verbose:
+                logger.info("✅ Reached all target positions.")
+            if self.log_writer is not None:
+                self.log_writer.write(positions)
         else:
-            print("❌ ERROR: Could not confirm all stages reached their targets.")
+            logger.error("❌ ERROR: Could not confirm all stages reached their targets.")
+        return reached
 
     def get_positions(self):
         """
         Return dictionary of positions for all session stages.
         Example: { 'SP1.Pos1': 90.001, 'SP3.Pos3': 0.002 }
         """
-        from .xps_motion import get_stage_position_with_offset
-        positions = {}
-        for stage in self.stages:
-            try:
-                pos = get_stage_position_with_offset(self.xps, stage)
-                positions[stage] = pos
-            except Exception as e:
-                print(f"❌ Failed to get position of {stage}: {e}")
-                positions[stage] = None
-        return positions
+        return get_stage_positions_with_offset(self.xps, self.stages)
 
     def close(self, kill_all=False):
         """
-        Close the XPS connection.
+        Close the XPS connection (and the session's CSV log, if open).
         If kill_all is True, will kill all groups (safest state for hardware!).
         """
+        if self.log_writer is not None:
+            self.log_writer.close()
+            self.log_writer = None
         if kill_all:
             try:
                 self.kill_all_groups()
             except Exception as e:
-                print(f"❌ Error during kill_all: {e}")
-        try:
-            self.xps.ftpconn.close()
-        except Exception:
-            pass
+                logger.error("❌ Error during kill_all: %s", e)
+        _safe_close(self.xps)
 
 """
 Usage: 
 session = XPSMotionSession(stages=[1,3])
 session.enable_groups()  # Only call this after power-up/reset or if hardware requires it!
+session.open_log("positions.csv")  # optional: one CSV handle for all moves
 session.move_motors(10, 12)  # No XPSError if already enabled!
 print(session.get_positions())
 session.close()
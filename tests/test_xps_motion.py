@@ -0,0 +1,290 @@
+"""
+Tests for newportxpslib.xps_motion against a stub controller (no hardware).
+
+Run with: python -m unittest discover tests   (or: python -m pytest tests)
+"""
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from newportxpslib import xps_motion
+from newportxpslib.xps_config import CONFIG
+from newportxpslib.xps_pool import close_pool
+
+
+class StubDriver:
+    """Stands in for xps._xps: records commands, answers from the StubXPS state."""
+
+    def __init__(self, xps):
+        self.xps = xps
+        self.calls = []
+        self._sockets = 0
+        self._moving_groups = set()
+        self._lock = threading.Lock()
+
+    def TCP_ConnectToServer(self, host, port, timeout):
+        self._sockets += 1
+        return self._sockets
+
+    def Login(self, sid, username, password):
+        return [0, ""]
+
+    def TCP_CloseSocket(self, sid):
+        pass
+
+    def GroupPositionCurrentGet(self, sid, name, n):
+        self.calls.append(("position", name))
+        if name in self.xps.failing_reads:
+            return [-1, 0.0]
+        if "." in name:
+            return [0, self.xps.hw[name]]
+        return [0] + [self.xps.hw[f"{name}.{p}"] for p in self.xps.groups[name]["positioners"]]
+
+    def GroupMoveAbsolute(self, sid, name, targets):
+        # Like the XPS: a move on a group that is still moving is refused
+        group = name.split(".")[0]
+        with self._lock:
+            self.calls.append(("move", name, list(targets)))
+            if group in self._moving_groups:
+                return [-22, ""]
+            self._moving_groups.add(group)
+        time.sleep(self.xps.move_time)
+        with self._lock:
+            self._moving_groups.discard(group)
+        stages = [name] if "." in name else [
+            f"{name}.{p}" for p in self.xps.groups[name]["positioners"]]
+        for stage, target in zip(stages, targets):
+            self.xps.hw[stage] = target
+        return [0, ""]
+
+    def Send(self, sid, cmd):
+        self.calls.append(("send", cmd))
+        if self.xps.status_error is not None:
+            raise self.xps.status_error
+        group = cmd.split("(", 1)[1].split(",", 1)[0]
+        moving = self.xps.moving.get(group, 0)
+        if moving:
+            self.xps.moving[group] = moving - 1
+        return [0, ",".join(["1" if moving else "0"] * cmd.count("int *"))]
+
+
+class StubXPS:
+    """Minimal NewportXPS look-alike with one stage per group by default."""
+
+    def __init__(self, stages=("SP1.Pos1", "SP2.Pos2")):
+        self.host = "10.0.0.1"
+        self.port = 5001
+        self.timeout = 10
+        self.username = self.password = "stub"
+        self._sid = 0
+        self._xps = StubDriver(self)
+        self.stages = {stage: {} for stage in stages}
+        self.groups = {}
+        for stage in stages:
+            group, positioner = stage.split(".")
+            self.groups.setdefault(group, {"positioners": []})["positioners"].append(positioner)
+        self.hw = {stage: 0.0 for stage in stages}
+        self.moving = {}
+        self.move_time = 0.0
+        self.failing_reads = set()
+        self.status_error = None
+        self.set_status("Ready state from homing, Referenced, Enabled")
+
+    def set_status(self, text):
+        self.status = "\n".join(f"{group} (ID 0): {text}" for group in self.groups)
+
+    def status_report(self):
+        self._xps.calls.append(("status",))
+        return self.status
+
+    def check_error(self, err, msg="", with_raise=True):
+        if err != 0:
+            raise Exception(f"{msg}: error {err}")
+
+    def move_stage(self, stage, value):
+        self._xps.GroupMoveAbsolute(self._sid, stage, [value])
+
+    def initialize_group(self, group):
+        self._xps.calls.append(("initialize", group))
+
+    def home_group(self, group):
+        self._xps.calls.append(("home", group))
+
+    def enable_group(self, group):
+        self._xps.calls.append(("enable", group))
+
+    def kill_group(self, group):
+        self._xps.calls.append(("kill", group))
+
+
+class MotionTestCase(unittest.TestCase):
+    """Gives every test a stub controller, its own CONFIG and no prepared groups."""
+
+    stages = ("SP1.Pos1", "SP2.Pos2")
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(xps_motion, "READY_STATE_FILE",
+                                    Path(tmp.name) / "xps_state.json")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.dict(CONFIG, {
+            "XPS_IP": "10.0.0.1",
+            "GROUPS": [s.split(".")[0] for s in self.stages],
+            "STAGES": list(self.stages),
+            "ZERO_OFFSETS": {},
+            "POSITION_TOL": 0.1,
+            "WAIT_DELAY": 0.001,
+            "MAX_WAIT_TIME": 0.2,
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        xps_motion.forget_ready_state()
+        xps_motion.invalidate_position_cache()
+        self.addCleanup(xps_motion.forget_ready_state)
+        self.xps = StubXPS(self.stages)
+        self.addCleanup(close_pool, self.xps)
+
+    def commands(self, kind):
+        return [call for call in self.xps._xps.calls if call[0] == kind]
+
+
+class PrepareGroupsTest(MotionTestCase):
+
+    def test_group_disabled_after_prepare_is_enabled_again(self):
+        self.xps.set_status("Not initialized state")
+        xps_motion.prepare_groups(self.xps)
+        self.assertEqual(len(self.commands("home")), 2)
+
+        # A later error leaves the groups referenced but disabled
+        self.xps.set_status("Disabled state, Referenced")
+        xps_motion.invalidate_ready_cache()
+        self.assertFalse(xps_motion.all_groups_ready_and_enabled(self.xps))
+        xps_motion.prepare_groups(self.xps)
+        self.assertEqual(self.commands("enable"),
+                         [("enable", "SP1"), ("enable", "SP2")])
+
+    def test_prepared_groups_skip_second_pass(self):
+        xps_motion.prepare_groups(self.xps)
+        self.xps._xps.calls.clear()
+        xps_motion.prepare_groups(self.xps)
+        self.assertEqual(self.xps._xps.calls, [])
+
+
+class WaitUntilReachedTest(MotionTestCase):
+
+    def test_polls_until_motion_done_and_in_tolerance(self):
+        self.xps.hw.update({"SP1.Pos1": 1.02, "SP2.Pos2": -0.5})
+        self.xps.moving["SP1"] = 3  # reports "moving" for the first three polls
+        self.assertTrue(xps_motion.wait_until_reached(self.xps, [1.0, -0.5]))
+        status_polls = [c for c in self.commands("send") if "(SP1," in c[1]]
+        self.assertGreaterEqual(len(status_polls), 4)
+        self.assertTrue(self.commands("position"))
+
+    def test_times_out_when_out_of_tolerance(self):
+        CONFIG["MAX_WAIT_TIME"] = 0.05
+        self.xps.hw["SP2.Pos2"] = 3.0
+        self.assertFalse(xps_motion.wait_until_reached(self.xps, [0.0, 2.0]))
+
+    def test_status_query_failure_falls_back_to_positions(self):
+        self.xps.status_error = OSError("socket closed")
+        with self.assertLogs("newportxpslib.xps_motion", "WARNING") as logs:
+            self.assertTrue(xps_motion.wait_until_reached(self.xps, [0.0, 0.0]))
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn("socket closed", logs.output[0])
+
+    def test_blocking_wait_fails_on_unreadable_stage(self):
+        self.xps.failing_reads.add("SP2.Pos2")
+        self.assertTrue(xps_motion.wait_until_reached_blocking(self.xps, [0.0], stages=["SP1.Pos1"]))
+        with self.assertLogs("newportxpslib.xps_motion", "ERROR"):
+            self.assertFalse(xps_motion.wait_until_reached_blocking(self.xps, [0.0, 0.0]))
+
+
+class ExecuteConfigurationsTest(MotionTestCase):
+
+    def test_accepts_a_generator(self):
+        combos = ([float(i), 0.0] for i in range(3))
+        xps_motion.execute_position_configurations(self.xps, combos, verbose=False)
+        self.assertEqual(self.xps.hw["SP1.Pos1"], 2.0)
+
+    def test_long_sweep_defaults_to_quiet(self):
+        combos = [[0.0, 0.0]] * (xps_motion.QUIET_SWEEP_THRESHOLD + 1)
+        with mock.patch.object(xps_motion, "tqdm", None), \
+                mock.patch.object(xps_motion.logger, "info") as info:
+            xps_motion.execute_position_configurations(self.xps, combos)
+        info.assert_not_called()
+
+
+class ReadyCacheTest(MotionTestCase):
+
+    def test_failed_read_drops_cached_ready_status(self):
+        self.assertTrue(xps_motion.all_groups_ready_and_enabled(self.xps))
+        self.xps.failing_reads.add("SP2.Pos2")
+        positions = xps_motion.get_stage_positions_with_offset(self.xps, list(self.stages))
+        self.assertIsNone(positions["SP2.Pos2"])
+        self.assertIsNone(xps_motion._ready_cache)
+
+    def test_explicit_status_bypasses_cached_ready(self):
+        self.assertTrue(xps_motion.all_groups_ready_and_enabled(self.xps))
+        self.xps.set_status("Disabled state, Referenced")
+        status = xps_motion.parse_status_report(self.xps)
+        self.assertFalse(xps_motion.all_groups_ready_and_enabled(self.xps, status=status))
+        self.assertIsNone(xps_motion._ready_cache)
+
+
+class ReadyStateFileTest(MotionTestCase):
+
+    def test_prepare_writes_record(self):
+        xps_motion.prepare_groups(self.xps)
+        self.assertTrue(xps_motion.load_ready_state())
+        self.assertFalse(Path(f"{xps_motion.READY_STATE_FILE}.tmp").exists())
+
+    def test_failed_wait_clears_record(self):
+        xps_motion.save_ready_state()
+        xps_motion.assume_groups_ready(self.xps)
+        self.assertFalse(xps_motion.wait_until_reached_blocking(self.xps, [5.0, 0.0]))
+        self.assertFalse(xps_motion.load_ready_state())
+        self.assertIsNone(xps_motion._ready_cache)
+
+    def test_trusted_record_is_dropped_by_live_check(self):
+        xps_motion.save_ready_state()
+        xps_motion.assume_groups_ready(self.xps)
+        self.xps.set_status("Disabled state, Referenced")  # e.g. controller power-cycled
+        xps_motion.invalidate_ready_cache()  # as if READY_CACHE_TTL had expired
+        self.assertFalse(xps_motion.all_groups_ready_and_enabled(self.xps))
+        self.assertFalse(xps_motion.load_ready_state())
+        xps_motion.prepare_groups(self.xps)
+        self.assertEqual(len(self.commands("enable")), 2)
+
+    def test_trusted_record_does_not_skip_explicit_preparation(self):
+        xps_motion.save_ready_state()
+        xps_motion.assume_groups_ready(self.xps)
+        self.xps.set_status("Not initialized state")  # power-cycled within the hour
+        xps_motion.initialize_groups(self.xps)
+        xps_motion.enable_groups(self.xps)
+        self.assertEqual(len(self.commands("initialize")), 2)
+        self.assertEqual(len(self.commands("enable")), 2)
+
+
+class BatchMoveTest(MotionTestCase):
+
+    stages = ("XYZ.X", "XYZ.Y", "XYZ.Z", "SP1.Pos1")
+
+    def test_partial_group_moves_are_sent_in_order(self):
+        self.xps.move_time = 0.02
+        errors = xps_motion.batch_move(self.xps, {"XYZ.X": 1.0, "XYZ.Y": 2.0, "SP1.Pos1": 3.0})
+        self.assertEqual(errors, [])
+        self.assertEqual(self.xps.hw, {"XYZ.X": 1.0, "XYZ.Y": 2.0, "XYZ.Z": 0.0, "SP1.Pos1": 3.0})
+
+    def test_full_group_is_one_command(self):
+        xps_motion.batch_move(self.xps, {"XYZ.X": 1.0, "XYZ.Y": 2.0, "XYZ.Z": 3.0})
+        self.assertEqual(self.commands("move"), [("move", "XYZ", [1.0, 2.0, 3.0])])
+
+
+if __name__ == "__main__":
+    unittest.main()